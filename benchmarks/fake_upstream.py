@@ -0,0 +1,151 @@
+"""
+This module contains local stand-in for restcountries.com API used by benchmarks.
+
+It serves /v3.1/all, /v3.1/region/{region} and /v3.1/subregion/{subregion} from recorded
+fixture, honours 'fields' query parameter and can be configured to add latency and to fail
+given fraction of requests with 503 status code. Settings can be changed while the server is
+running with GET /control?latency=<seconds>&error_rate=<fraction>.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'all.json')
+_API_PREFIX = '/v3.1'
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    """
+    Class representing local HTTP server imitating restcountries.com API.
+    """
+    daemon_threads = True
+
+    def __init__(self, server_address: tuple[str, int], fixture_path: str = _FIXTURE_PATH,
+                 latency: float = 0.0, error_rate: float = 0.0) -> None:
+        """
+        :param server_address: Tuple containing address and port the server listens on.
+        :param fixture_path: Path of JSON file with recorded response of /all endpoint.
+        :param latency: Time in seconds added to every response.
+        :param error_rate: Fraction of requests answered with 503 status code.
+        """
+        with open(fixture_path, encoding='utf-8') as file:
+            self.countries = json.load(file)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_count = 0
+        self._lock = threading.Lock()
+        super().__init__(server_address, _FakeUpstreamHandler)
+
+    @property
+    def base_url(self) -> str:
+        """
+        URL which should be used as remote API host by Countries API.
+        """
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}{_API_PREFIX}'
+
+    def count_request(self) -> None:
+        """
+        Function that increments number of received API requests.
+        """
+        with self._lock:
+            self.requests_count += 1
+
+    def select(self, kind: str, name: str) -> list:
+        """
+        Function that selects countries matching the request.
+        :param kind: Either 'all', 'region' or 'subregion'.
+        :param name: Region or subregion name, ignored for 'all'.
+        :return: List of matching countries, empty if the name is unknown.
+        """
+        if kind == 'all':
+            return self.countries
+        return [country for country in self.countries if country.get(kind, '').lower() == name.lower()]
+
+
+class _FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """
+    Class representing handler of requests to fake remote host.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        """
+        Function that handles HTTP GET requests received by the server.
+        """
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/control':
+            self._control(query)
+            return
+
+        parts = unquote(url.path).removeprefix(_API_PREFIX).strip('/').split('/')
+        if parts[0] not in ('all', 'region', 'subregion') or len(parts) != (1 if parts[0] == 'all' else 2):
+            self._send_json({'status': 404, 'message': 'Not Found'}, status_code=404)
+            return
+
+        self.server.count_request()
+        time.sleep(self.server.latency)
+        if random.random() < self.server.error_rate:
+            self._send_json({'status': 503, 'message': 'Service Unavailable'}, status_code=503)
+            return
+
+        countries = self.server.select(kind=parts[0], name=parts[-1])
+        if not countries:
+            self._send_json({'status': 404, 'message': 'Not Found'}, status_code=404)
+            return
+
+        fields = [field for value in query.get('fields', []) for field in value.split(',')]
+        if fields:
+            countries = [{key: value for key, value in country.items() if key in fields} for country in countries]
+        self._send_json(countries)
+
+    def _control(self, query: dict) -> None:
+        """
+        Function that changes latency and error rate of the server.
+        :param query: Parsed query parameters.
+        """
+        if 'latency' in query:
+            self.server.latency = float(query['latency'][0])
+        if 'error_rate' in query:
+            self.server.error_rate = float(query['error_rate'][0])
+        self._send_json({'latency': self.server.latency, 'error_rate': self.server.error_rate,
+                         'requests': self.server.requests_count})
+
+    def _send_json(self, data: object, status_code: int = 200) -> None:
+        """
+        Function that sends JSON response.
+        :param data: Data to be sent.
+        :param status_code: Status code of the response.
+        """
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """
+        Function that silences request logging.
+        """
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for restcountries.com API.')
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--fixture', default=_FIXTURE_PATH)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    arguments = parser.parse_args()
+
+    upstream = FakeUpstreamServer((arguments.address, arguments.port), fixture_path=arguments.fixture,
+                                  latency=arguments.latency, error_rate=arguments.error_rate)
+    print(f'Serving fake remote host at {upstream.base_url}')
+    upstream.serve_forever()
@@ -0,0 +1,114 @@
+"""
+This module contains load generator driving Countries API endpoints and summarizing latency of responses.
+"""
+from http.client import HTTPConnection
+import itertools
+import threading
+import time
+from urllib.parse import quote
+
+_ENDPOINTS = ('/top_ten_countries/{region}', '/all_countries_in_subregion/{subregion}',
+              '/population_of_subregion/{subregion}')
+_FORMATS = ('json', 'csv')
+_PERCENTILES = (50, 95, 99)
+_REQUEST_TIMEOUT = 30
+
+
+def build_requests(regions: list, subregions: list, formats: tuple = _FORMATS) -> list[tuple[str, str]]:
+    """
+    Function that builds list of requests covering every endpoint in every format.
+    :param regions: Region names used with /top_ten_countries endpoint.
+    :param subregions: Subregion names used with subregion endpoints.
+    :param formats: Values of Accept header.
+    :return: List of tuples containing path and value of Accept header.
+    """
+    paths = []
+    for endpoint in _ENDPOINTS:
+        names = regions if '{region}' in endpoint else subregions
+        paths.extend(endpoint.format(region=quote(name), subregion=quote(name)) for name in names)
+    return [(path, accept) for path in paths for accept in formats]
+
+def run_load(address: tuple[str, int], requests: list[tuple[str, str]], total: int, concurrency: int) -> dict:
+    """
+    Function that sends given number of requests from concurrent clients, each of them using
+    single keep-alive connection, and summarizes results.
+    :param address: Tuple containing address and port of the server.
+    :param requests: List of tuples containing path and value of Accept header, sent in turn.
+    :param total: Total number of requests to be sent.
+    :param concurrency: Number of concurrent clients.
+    :return: Dictionary containing summary of the run (see summarize function).
+    """
+    request_cycle = itertools.cycle(requests)
+    lock = threading.Lock()
+    remaining = [total]
+    latencies = []
+    statuses = {}
+
+    def client() -> None:
+        connection = HTTPConnection(*address, timeout=_REQUEST_TIMEOUT)
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    break
+                remaining[0] -= 1
+                path, accept = next(request_cycle)
+
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers={'Accept': accept})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.will_close:
+                    connection.close()
+            except (OSError, ValueError):
+                connection.close()
+                status = 'error'
+            latency = time.perf_counter() - start
+
+            with lock:
+                latencies.append(latency)
+                statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    return summarize(latencies=latencies, statuses=statuses, duration=duration)
+
+def summarize(latencies: list[float], statuses: dict, duration: float) -> dict:
+    """
+    Function that computes throughput and latency percentiles.
+    :param latencies: Latencies of responses in seconds.
+    :param statuses: Number of responses per status code ('error' for failed connections).
+    :param duration: Duration of the run in seconds.
+    :return: Dictionary containing number of requests, errors, throughput in requests per second,
+             latency percentiles and maximal latency in milliseconds and responses per status code.
+    """
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status == 'error' or status >= 400)
+    summary = {'requests': len(ordered), 'errors': errors,
+               'duration_s': round(duration, 3),
+               'throughput_rps': round(len(ordered) / duration, 1) if duration else 0.0}
+    for percentile in _PERCENTILES:
+        summary[f'p{percentile}_ms'] = round(percentile_of(ordered, percentile) * 1000, 3)
+    summary['max_ms'] = round(ordered[-1] * 1000, 3) if ordered else 0.0
+    summary['statuses'] = {str(status): count for status, count in sorted(statuses.items(), key=str)}
+    return summary
+
+def percentile_of(ordered: list[float], percentile: float) -> float:
+    """
+    Function that returns percentile of sorted values using nearest-rank method.
+    :param ordered: Sorted values.
+    :param percentile: Percentile between 0 and 100.
+    :return: Value of the percentile, 0 if there are no values.
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percentile // 100))
+    return ordered[int(rank) - 1]
@@ -0,0 +1,157 @@
+"""
+This module runs load and latency benchmarks of Countries API against local fake remote host
+and writes results in JSON format.
+
+Scenarios:
+- cold: requests sent to freshly started server, so the first ones fill the caches,
+- warm: the same requests sent again to the server started in cold scenario,
+- degraded: freshly started server with short cache TTL, while remote host responds slowly
+  and fails part of requests.
+
+Usage: python -m benchmarks.run_benchmarks --requests 2000 --concurrency 16 --output results.json
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.fake_upstream import FakeUpstreamServer
+from benchmarks.load_generator import build_requests, run_load
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SERVER_PATH = os.path.join(_ROOT_PATH, 'src', 'server.py')
+_LOCALHOST = '127.0.0.1'
+_STARTUP_TIMEOUT = 10
+_SCENARIOS = ('cold', 'warm', 'degraded')
+
+
+def main() -> None:
+    """
+    Function that parses command line arguments, runs benchmarks and writes results.
+    """
+    parser = argparse.ArgumentParser(description='Load and latency benchmarks of Countries API.')
+    parser.add_argument('--requests', type=int, default=2000, help='Number of requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=16, help='Number of concurrent clients.')
+    parser.add_argument('--data-source', choices=('region', 'snapshot'), default='region',
+                        help='Value of COUNTRIES_API_DATA_SOURCE used by the server.')
+    parser.add_argument('--workers', type=int, default=16, help='Value of COUNTRIES_API_WORKERS.')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Value of COUNTRIES_API_PROCESSES, more than 1 enables pre-fork mode.')
+    parser.add_argument('--scenarios', nargs='+', choices=_SCENARIOS, default=list(_SCENARIOS))
+    parser.add_argument('--degraded-latency', type=float, default=0.2,
+                        help='Latency of remote host in degraded scenario in seconds.')
+    parser.add_argument('--degraded-error-rate', type=float, default=0.3,
+                        help='Fraction of failed remote host requests in degraded scenario.')
+    parser.add_argument('--degraded-ttl', type=float, default=1.0,
+                        help='Cache TTL used by the server in degraded scenario in seconds.')
+    parser.add_argument('--output', help='Path of JSON file with results, printed when omitted.')
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments)
+    report = json.dumps(results, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as file:
+            file.write(f'{report}\n')
+    else:
+        print(report)
+
+def run_benchmarks(arguments: argparse.Namespace) -> dict:
+    """
+    Function that runs selected scenarios.
+    :param arguments: Parsed command line arguments.
+    :return: Dictionary containing metadata of the run and results of every scenario.
+    """
+    upstream = FakeUpstreamServer((_LOCALHOST, 0))
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    requests = build_requests(regions=sorted({country['region'] for country in upstream.countries}),
+                              subregions=sorted({country['subregion'] for country in upstream.countries}))
+    environment = {'COUNTRIES_API_UPSTREAM_HOST': upstream.base_url,
+                   'COUNTRIES_API_DATA_SOURCE': arguments.data_source,
+                   'COUNTRIES_API_WORKERS': str(arguments.workers),
+                   'COUNTRIES_API_PROCESSES': str(arguments.processes)}
+
+    scenarios = {}
+    try:
+        if {'cold', 'warm'} & set(arguments.scenarios):
+            with _ServerProcess(environment) as server:
+                cold = run_load(server.address, requests, arguments.requests, arguments.concurrency)
+                if 'cold' in arguments.scenarios:
+                    scenarios['cold'] = cold
+                if 'warm' in arguments.scenarios:
+                    scenarios['warm'] = run_load(server.address, requests, arguments.requests,
+                                                 arguments.concurrency)
+
+        if 'degraded' in arguments.scenarios:
+            upstream.latency = arguments.degraded_latency
+            upstream.error_rate = arguments.degraded_error_rate
+            with _ServerProcess(environment | {'COUNTRIES_API_CACHE_TTL': str(arguments.degraded_ttl)}) as server:
+                scenarios['degraded'] = run_load(server.address, requests, arguments.requests,
+                                                 arguments.concurrency)
+    finally:
+        upstream.shutdown()
+        upstream.server_close()
+
+    return {'metadata': {'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                         'python': platform.python_version(),
+                         'platform': platform.platform(),
+                         'config': vars(arguments)},
+            'scenarios': scenarios}
+
+
+class _ServerProcess:
+    """
+    Class representing Countries API server started as separate process.
+    """
+
+    def __init__(self, environment: dict) -> None:
+        """
+        :param environment: Environment variables passed to the server in addition to current ones.
+        """
+        self.address = (_LOCALHOST, _free_port())
+        self._environment = os.environ | environment | {
+            'PYTHONPATH': _ROOT_PATH,
+            'COUNTRIES_API_BIND_ADDRESS': self.address[0],
+            'COUNTRIES_API_PORT': str(self.address[1])}
+        self._process = None
+
+    def __enter__(self) -> '_ServerProcess':
+        self._process = subprocess.Popen([sys.executable, _SERVER_PATH], env=self._environment,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + _STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(self.address, timeout=1).close()
+                return self
+            except OSError:
+                if self._process.poll() is not None:
+                    break
+                time.sleep(0.05)
+        self.__exit__()
+        raise RuntimeError(f'Server did not start listening on {self.address[0]}:{self.address[1]}')
+
+    def __exit__(self, *exc_info) -> None:
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=_STARTUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+
+def _free_port() -> int:
+    """
+    Function that returns number of currently unused local TCP port.
+    """
+    with socket.socket() as probe:
+        probe.bind((_LOCALHOST, 0))
+        return probe.getsockname()[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+This module contains definition of admission control limiting number of requests handled at the same time
+and rate of requests of single client.
+"""
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+import itertools
+import math
+import os
+import threading
+import time
+from src.metrics import counter
+
+_MAX_IN_FLIGHT = int(os.environ.get('COUNTRIES_API_MAX_IN_FLIGHT', 12))
+_MAX_UPSTREAM_IN_FLIGHT = int(os.environ.get('COUNTRIES_API_MAX_UPSTREAM_IN_FLIGHT', 8))
+_ADMISSION_QUEUE_SIZE = int(os.environ.get('COUNTRIES_API_ADMISSION_QUEUE', 4))
+_ADMISSION_TIMEOUT = float(os.environ.get('COUNTRIES_API_ADMISSION_TIMEOUT', 1.0))
+_CLIENT_RATE = float(os.environ.get('COUNTRIES_API_CLIENT_RATE', 0))  # requests per second, 0 disables the limit
+_CLIENT_BURST = float(os.environ.get('COUNTRIES_API_CLIENT_BURST', 20))
+_MAX_CLIENTS = 10000
+_OVERLOADED_STATUS_CODE = 503
+_RATE_LIMITED_STATUS_CODE = 429
+_OVERLOADED_RETRY_AFTER = 1
+_CACHED_PRIORITY = 0
+_UPSTREAM_PRIORITY = 1
+
+_rejected_requests = counter('countries_api_rejected_requests_total',
+                             'Requests rejected by admission control by reason.', ('reason',))
+
+
+class RequestRejectedError(Exception):
+    """
+    Exception raised when request is not admitted, it holds status code of the response and
+    number of seconds after which the client should retry.
+    """
+    def __init__(self, message: str, reason: str, status_code: int, retry_after: int) -> None:
+        """
+        :param message: Description of the reason.
+        :param reason: Short reason used as label of metrics.
+        :param status_code: Status code of the response.
+        :param retry_after: Value of Retry-After header in seconds.
+        """
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """
+    Class representing request waiting for admission.
+    """
+    __slots__ = ('priority', 'sequence', 'event', 'state')
+
+    def __init__(self, priority: int, sequence: int) -> None:
+        """
+        :param priority: Priority of the request, lower value is admitted first.
+        :param sequence: Number of the request, requests with equal priority are admitted in order.
+        """
+        self.priority = priority
+        self.sequence = sequence
+        self.event = threading.Event()
+        self.state = 'waiting'  # 'waiting', 'admitted', 'displaced' or 'expired'
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class _TokenBucket:
+    """
+    Class representing token bucket of single client, refilled continuously with given rate
+    up to its capacity. Each request takes one token.
+    """
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, capacity: float, now: float) -> None:
+        """
+        :param capacity: Initial number of tokens.
+        :param now: Current monotonic time.
+        """
+        self.tokens = capacity
+        self.updated_at = now
+
+    def take(self, rate: float, capacity: float, now: float) -> float:
+        """
+        Function that refills the bucket and takes one token if available.
+        :param rate: Number of tokens added per second.
+        :param capacity: Maximal number of tokens.
+        :param now: Current monotonic time.
+        :return: 0 if the token was taken, otherwise number of seconds until it is available.
+        """
+        self.tokens = min(capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class AdmissionController:
+    """
+    Class representing admission control of requests. At most max_in_flight requests are handled
+    at the same time and at most max_upstream_in_flight of them may need data from remote host, so
+    remaining slots are reserved for requests which can be answered from cached data. Further requests
+    wait in bounded queue until they are admitted or the timeout passes. Requests answered from cached
+    data have priority: they are admitted first and when the queue is full they displace the newest
+    waiting request which needs data from remote host. Rejected requests are answered immediately with
+    503 status code. Optionally each client is limited with token bucket and requests exceeding its
+    rate are answered with 429 status code.
+    """
+    def __init__(self, max_in_flight: int = _MAX_IN_FLIGHT, queue_size: int = _ADMISSION_QUEUE_SIZE,
+                 timeout: float = _ADMISSION_TIMEOUT, client_rate: float = _CLIENT_RATE,
+                 client_burst: float = _CLIENT_BURST, max_clients: int = _MAX_CLIENTS,
+                 max_upstream_in_flight: int = _MAX_UPSTREAM_IN_FLIGHT) -> None:
+        """
+        :param max_in_flight: Maximal number of requests handled at the same time, 0 for no limit.
+        :param queue_size: Maximal number of requests waiting for admission.
+        :param timeout: Maximal time in seconds request waits for admission.
+        :param client_rate: Number of requests per second allowed for single client, 0 for no limit.
+        :param client_burst: Number of requests single client can send at once.
+        :param max_clients: Maximal number of remembered clients, least recently seen are forgotten.
+        :param max_upstream_in_flight: Maximal number of handled requests which need data from remote host,
+                                       0 for no limit other than max_in_flight.
+        """
+        self.max_in_flight = max_in_flight
+        self.max_upstream_in_flight = max_upstream_in_flight
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._upstream_in_flight = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._buckets = OrderedDict()
+
+    @contextmanager
+    def admit(self, client: str, cached: bool) -> Iterator[None]:
+        """
+        Context manager which admits request and releases its slot when the request is handled.
+        :param client: Address of the client.
+        :param cached: Flag indicating if the request can be answered from cached data.
+        :raises RequestRejectedError: If the request is not admitted.
+        """
+        priority = _CACHED_PRIORITY if cached else _UPSTREAM_PRIORITY
+        self._check_rate(client)
+        self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def stats(self) -> dict:
+        """
+        Function that returns number of requests handled and waiting for admission.
+        :return: Dictionary with 'in_flight', 'upstream_in_flight' and 'waiting' values.
+        """
+        with self._lock:
+            return {'in_flight': self._in_flight, 'upstream_in_flight': self._upstream_in_flight,
+                    'waiting': len(self._waiters)}
+
+    def _check_rate(self, client: str) -> None:
+        """
+        Function that takes token from the bucket of the client.
+        :param client: Address of the client.
+        :raises RequestRejectedError: If the client exceeded its rate.
+        """
+        if self.client_rate <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = _TokenBucket(self.client_burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            wait = bucket.take(self.client_rate, self.client_burst, now)
+        if wait:
+            _rejected_requests.inc('rate_limited')
+            raise RequestRejectedError('Too many requests', reason='rate_limited',
+                                       status_code=_RATE_LIMITED_STATUS_CODE, retry_after=math.ceil(wait))
+
+    def _acquire(self, priority: int) -> None:
+        """
+        Function that waits until the request can be handled.
+        :param priority: Priority of the request, lower value is admitted first.
+        :raises RequestRejectedError: If the queue is full or the timeout passed.
+        """
+        with self._lock:
+            if self._fits(priority) and not any(waiter.priority <= priority for waiter in self._waiters):
+                self._take(priority)
+                return
+            if len(self._waiters) >= self.queue_size and not self._displace(priority):
+                self._reject('queue_full')
+            waiter = _Waiter(priority, next(self._sequence))
+            self._waiters.append(waiter)
+
+        waiter.event.wait(self.timeout)
+        with self._lock:
+            if waiter.state == 'waiting':
+                waiter.state = 'expired'
+                self._remove(waiter)
+            state = waiter.state
+        if state != 'admitted':
+            self._reject(state)
+
+    def _displace(self, priority: int) -> bool:
+        """
+        Function that removes the newest waiting request with lower priority from the queue,
+        it has to be called with the lock held.
+        :param priority: Priority of the request which needs place in the queue.
+        :return: True if request was displaced, False if there is none with lower priority.
+        """
+        candidates = [waiter for waiter in self._waiters if waiter.priority > priority]
+        if not candidates:
+            return False
+        displaced = max(candidates, key=lambda waiter: (waiter.priority, waiter.sequence))
+        displaced.state = 'displaced'
+        self._remove(displaced)
+        displaced.event.set()
+        return True
+
+    def _remove(self, waiter: _Waiter) -> None:
+        """
+        Function that removes request from the queue, it has to be called with the lock held.
+        :param waiter: Request to be removed.
+        """
+        self._waiters.remove(waiter)
+
+    def _fits(self, priority: int) -> bool:
+        """
+        Function that checks if request with given priority can be handled now,
+        it has to be called with the lock held.
+        :param priority: Priority of the request.
+        :return: True if there is free slot for the request, False otherwise.
+        """
+        if 0 < self.max_in_flight <= self._in_flight:
+            return False
+        return priority == _CACHED_PRIORITY or not 0 < self.max_upstream_in_flight <= self._upstream_in_flight
+
+    def _take(self, priority: int) -> None:
+        """
+        Function that takes slot for request with given priority, it has to be called with the lock held.
+        :param priority: Priority of the request.
+        """
+        self._in_flight += 1
+        if priority == _UPSTREAM_PRIORITY:
+            self._upstream_in_flight += 1
+
+    def _release(self, priority: int) -> None:
+        """
+        Function that frees slot of handled request and admits waiting requests which fit
+        into free slots, in order of priority.
+        :param priority: Priority of the handled request.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if priority == _UPSTREAM_PRIORITY:
+                self._upstream_in_flight -= 1
+            for waiter in sorted(self._waiters):
+                if self._fits(waiter.priority):
+                    self._take(waiter.priority)
+                    self._remove(waiter)
+                    waiter.state = 'admitted'
+                    waiter.event.set()
+
+    def _reject(self, reason: str) -> None:
+        """
+        Function that rejects request because the server is overloaded.
+        :param reason: Short reason used as label of metrics.
+        :raises RequestRejectedError: Always.
+        """
+        _rejected_requests.inc(reason)
+        raise RequestRejectedError('Server is overloaded, try again later', reason=reason,
+                                   status_code=_OVERLOADED_STATUS_CODE, retry_after=_OVERLOADED_RETRY_AFTER)
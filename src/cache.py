@@ -0,0 +1,155 @@
+"""
+This module contains definition of the cache with time-to-live used to store data retrieved from remote host.
+"""
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+_REFRESH_RETRY_DELAY = 30
+
+_logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """
+    Class representing single cache entry.
+    """
+    __slots__ = ('value', 'loaded_at', 'refreshing', 'refresh_after')
+
+    def __init__(self, value: object, loaded_at: float) -> None:
+        self.value = value
+        self.loaded_at = loaded_at
+        self.refreshing = False
+        self.refresh_after = 0.0
+
+
+class TTLCache:
+    """
+    Class representing least recently used cache with time-to-live of entries.
+    Expired entries are still returned (stale-while-revalidate) while single background
+    refresh of the entry is running. If the refresh fails, the last value is kept.
+    """
+    def __init__(self, capacity: int, ttl: float) -> None:
+        """
+        :param capacity: Maximal number of stored entries.
+        :param ttl: Time in seconds after which entry is considered stale.
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0, 'refresh_errors': 0}
+
+    def get(self, key: object, loader: callable) -> object:
+        """
+        Function that returns cached value for the key. If there is no value, it is loaded
+        with given loader. If the value is stale, it is returned and refreshed in background.
+        :param key: Key of the entry.
+        :param loader: Function without arguments returning value for the key.
+        :return: Cached or loaded value.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                if now - entry.loaded_at < self.ttl:
+                    self._counters['hits'] += 1
+                    return entry.value
+
+                self._counters['stale'] += 1
+                start_refresh = not entry.refreshing and now >= entry.refresh_after
+                if start_refresh:
+                    entry.refreshing = True
+
+        if entry is None:
+            value = loader()
+            self.put(key, value)
+            return value
+
+        if start_refresh:
+            threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+        return entry.value
+
+    def refresh(self, key: object, loader: callable) -> None:
+        """
+        Function that starts background refresh of the entry regardless of its age,
+        unless refresh of the entry is already running.
+        :param key: Key of the entry.
+        :param loader: Function without arguments returning value for the key.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.refreshing:
+                    return
+                entry.refreshing = True
+
+        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+
+    def peek(self, key: object) -> object | None:
+        """
+        Function that returns cached value for the key, even if stale, without loading it
+        or affecting statistics.
+        :param key: Key of the entry.
+        :return: Cached value or None if there is no entry for the key.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else entry.value
+
+    def put(self, key: object, value: object, loaded_at: float | None = None) -> None:
+        """
+        Function that stores value for the key and evicts least recently used entries
+        if the capacity is exceeded.
+        :param key: Key of the entry.
+        :param value: Value to be stored.
+        :param loaded_at: Monotonic time at which the value was loaded, now by default.
+        """
+        entry = _Entry(value, time.monotonic() if loaded_at is None else loaded_at)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self) -> None:
+        """
+        Function that removes all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Function that returns cache statistics.
+        :return: Dictionary containing number of hits, misses, stale hits, evictions,
+                 failed refreshes and current size of the cache.
+        """
+        with self._lock:
+            return self._counters | {'size': len(self._entries), 'capacity': self.capacity}
+
+    def _refresh(self, key: object, loader: callable) -> None:
+        """
+        Function that loads new value for stale entry. If loading fails, the stale value
+        is kept and next refresh is postponed.
+        :param key: Key of the entry.
+        :param loader: Function without arguments returning value for the key.
+        """
+        try:
+            value = loader()
+        except Exception as error:  # pylint: disable=broad-except
+            _logger.warning('Refreshing cache entry %r failed, serving stale value: %s', key, error)
+            with self._lock:
+                self._counters['refresh_errors'] += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+                    entry.refresh_after = time.monotonic() + _REFRESH_RETRY_DELAY
+            return
+
+        self.put(key, value)
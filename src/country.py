@@ -0,0 +1,144 @@
+"""
+This module contains definitions of compact immutable records representing single country.
+"""
+from collections.abc import Iterator, Mapping
+import itertools
+import json
+import sys
+from src.csv_converter import encode_csv_row
+
+_FIELDS = ('name', 'capital', 'region', 'subregion', 'borders', 'area', 'population')
+
+
+class Country(Mapping):
+    """
+    Class representing immutable record with information about single country. Region, subregion
+    and border codes are interned, so they are shared by all records. Fields are available as
+    attributes and, for serialization, through read-only mapping interface with the same keys
+    and values as sanitized dictionary retrieved from remote host. Three-letter code of the
+    country (cca3) is available only as attribute, so it is not serialized. JSON object and
+    CSV line of the record are encoded to bytes once, when the record is created, so responses
+    are assembled from them without converting the record again.
+    """
+    __slots__ = _FIELDS + ('code', 'encoded_json', 'encoded_csv')
+    csv_columns = _FIELDS
+
+    def __init__(self, name: str, capital: str, region: str, subregion: str,
+                 borders: tuple[str, ...], area: float, population: int, code: str = '') -> None:
+        """
+        :param name: Common name of the country.
+        :param capital: Capital of the country.
+        :param region: Region name.
+        :param subregion: Subregion name.
+        :param borders: Codes of neighbouring countries.
+        :param area: Area of the country.
+        :param population: Population of the country.
+        :param code: Three-letter code of the country (cca3), referenced by borders of its neighbours.
+        """
+        for field, value in (('name', name), ('capital', capital), ('region', sys.intern(region)),
+                             ('subregion', sys.intern(subregion)),
+                             ('borders', tuple(sys.intern(border) for border in borders)),
+                             ('area', area), ('population', population), ('code', sys.intern(code))):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, 'encoded_json', json.dumps(self.as_dict()).encode())
+        object.__setattr__(self, 'encoded_csv', encode_csv_row(self[field] for field in _FIELDS))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Country':
+        """
+        Function that creates record from sanitized dictionary retrieved from remote host.
+        :param data: Sanitized information about country.
+        :return: Country record.
+        """
+        return cls(name=data['name'], capital=data['capital'], region=data['region'],
+                   subregion=data.get('subregion', ''), borders=data.get('borders', ()),
+                   area=data['area'], population=data['population'], code=data.get('cca3', ''))
+
+    def as_dict(self) -> dict:
+        """
+        Function that converts record to dictionary.
+        :return: Dictionary with information about country.
+        """
+        return {field: self[field] for field in _FIELDS}
+
+    def __getitem__(self, field: str) -> object:
+        if field not in _FIELDS:
+            raise KeyError(field)
+        value = getattr(self, field)
+        return list(value) if field == 'borders' else value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+    def __setattr__(self, field: str, value: object) -> None:
+        raise AttributeError('Country record is immutable')
+
+    def __delattr__(self, field: str) -> None:
+        raise AttributeError('Country record is immutable')
+
+    def __repr__(self) -> str:
+        return f'Country({self.as_dict()!r})'
+
+    def __reduce__(self) -> tuple:
+        return (self.__class__, tuple(getattr(self, field) for field in _FIELDS + ('code',)))
+
+
+class AnnotatedCountry(Mapping):
+    """
+    Class representing immutable country record with additional fields attached, e.g. total
+    population of its subregion, which are serialized after fields of the record. JSON object
+    and CSV line are encoded when it is created by appending encoded additional fields to
+    encoded country record.
+    """
+    __slots__ = ('country', 'fields', 'csv_columns', 'encoded_json', 'encoded_csv')
+
+    def __init__(self, country: Country, fields: dict) -> None:
+        """
+        :param country: Country record.
+        :param fields: Dictionary mapping names of additional fields, different from fields of the record, to values.
+        """
+        encoded_fields = ''.join(f', {json.dumps(name)}: {json.dumps(value)}' for name, value in fields.items())
+        for name, value in (('country', country), ('fields', fields), ('csv_columns', _FIELDS + tuple(fields)),
+                            ('encoded_json', country.encoded_json[:-1] + encoded_fields.encode() + b'}'),
+                            # leading empty value makes the row start with separator
+                            ('encoded_csv', country.encoded_csv.removesuffix(b'\r\n')
+                             + encode_csv_row(itertools.chain([''], fields.values())))):
+            object.__setattr__(self, name, value)
+
+    def as_dict(self) -> dict:
+        """
+        Function that converts record to dictionary.
+        :return: Dictionary with information about country and additional fields.
+        """
+        return self.country.as_dict() | self.fields
+
+    def __getitem__(self, field: str) -> object:
+        if field in self.fields:
+            return self.fields[field]
+        return self.country[field]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.csv_columns)
+
+    def __len__(self) -> int:
+        return len(self.csv_columns)
+
+    def __setattr__(self, field: str, value: object) -> None:
+        raise AttributeError('Country record is immutable')
+
+    def __repr__(self) -> str:
+        return f'AnnotatedCountry({self.as_dict()!r})'
+
+
+def encode_country(value: object) -> dict:
+    """
+    Function used as default function of JSON encoder which converts country records to dictionaries.
+    :param value: Object which JSON encoder cannot serialize.
+    :return: Dictionary with information about country.
+    """
+    if isinstance(value, (Country, AnnotatedCountry)):
+        return value.as_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
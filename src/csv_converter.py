@@ -1,27 +1,88 @@
 """
 This module contains function to convert JSON-like objects (dicts and lists) to CSV files.
 """
+from collections.abc import Iterable, Iterator, Mapping
 import io
 import csv
+import itertools
 
 _CSV_DIALECT = "excel"
 _MISSING_VAL = "-"
 
 
-def convert_json_to_csv(data: dict | list) -> str:
+def convert_json_to_csv(data: Mapping | list) -> str:
     """
     Function that converts JSON-like object to CSV file.
-    :param data: JSON-like object to be converted.
+    :param data: JSON-like object (dict, country record or list of them) to be converted.
     :returns: Data in CSV format as string.
     """
+    return ''.join(iter_csv_lines(data))
 
-    if isinstance(data, dict):
-        data = [data]
+def iter_csv_lines(data: Mapping | Iterable[Mapping]) -> Iterator[str]:
+    """
+    Generator that converts JSON-like object to CSV file line by line, so the whole
+    file does not have to be kept in memory. Columns are taken from the first row.
+    :param data: JSON-like object (mapping or iterable of mappings) to be converted.
+    :returns: Iterator of CSV lines, the header is returned together with the first row.
+    """
+    rows = iter([data] if isinstance(data, Mapping) else data)
+    first_row = next(rows, None)
+    if first_row is None:
+        return
 
     output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=data[0].keys(), dialect=_CSV_DIALECT,
+    writer = csv.DictWriter(output, fieldnames=first_row.keys(), dialect=_CSV_DIALECT,
                             restval=_MISSING_VAL, extrasaction='ignore')
     writer.writeheader()
-    writer.writerows(data)
+    for row in itertools.chain([first_row], rows):
+        writer.writerow(row)
+        yield _take_value(output)
+
+def iter_encoded_csv_lines(data: Mapping | Iterable[Mapping]) -> Iterator[bytes]:
+    """
+    Generator that converts JSON-like object to CSV file encoded to bytes line by line. Lines
+    of country records, which are encoded when the records are created, are not converted again.
+    The result is identical to encoded lines returned by iter_csv_lines.
+    :param data: JSON-like object (mapping or iterable of mappings) to be converted.
+    :returns: Iterator of encoded CSV lines, the header is returned separately.
+    """
+    rows = iter([data] if isinstance(data, Mapping) else data)
+    first_row = next(rows, None)
+    if first_row is None:
+        return
+
+    rows = itertools.chain([first_row], rows)
+    columns = getattr(first_row, 'csv_columns', None)
+    if columns is None:
+        for line in iter_csv_lines(rows):
+            yield line.encode()
+        return
+
+    yield encode_csv_row(columns)
+    for row in rows:
+        if getattr(row, 'csv_columns', None) == columns:
+            yield row.encoded_csv
+        else:
+            yield encode_csv_row(row.get(column, _MISSING_VAL) for column in columns)
 
-    return output.getvalue()
+def encode_csv_row(values: Iterable) -> bytes:
+    """
+    Function that converts single row of values to CSV line encoded to bytes,
+    in the same way as rows converted by iter_csv_lines.
+    :param values: Values of the row.
+    :returns: Encoded CSV line.
+    """
+    output = io.StringIO()
+    csv.writer(output, dialect=_CSV_DIALECT).writerow(values)
+    return output.getvalue().encode()
+
+def _take_value(output: io.StringIO) -> str:
+    """
+    Function that returns content of the buffer and empties it.
+    :param output: Buffer to be emptied.
+    :returns: Content of the buffer.
+    """
+    value = output.getvalue()
+    output.seek(0)
+    output.truncate(0)
+    return value
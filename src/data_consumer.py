@@ -1,14 +1,306 @@
 """
 This module contains function for retrieving data from remote API host.
 """
-from functools import lru_cache
+import logging
+import math
+import os
+import random
+import threading
+import time
+from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
+from src.cache import TTLCache
+from src.country import Country
+from src.metrics import counter, histogram
+from src.precompute import BorderGraph, CountryGroup
+from src.snapshot_store import SnapshotFileError, load_snapshot, save_snapshot
 
 _REQUEST_TIMEOUT = 10
-_CACHE_CAPACITY = 5
-_COUNTRIES_API_HOST = 'https://restcountries.com/v3.1'
+_UPSTREAM_POOL_SIZE = int(os.environ.get('COUNTRIES_API_UPSTREAM_POOL_SIZE', 10))
+_UPSTREAM_MAX_RETRIES = 2
+_UPSTREAM_BACKOFF_BASE = 0.2
+_UPSTREAM_BACKOFF_MAX = 2.0
+_UPSTREAM_RETRY_STATUS_CODES = (500, 502, 503, 504)
+_CIRCUIT_FAILURE_THRESHOLD = 5
+_CIRCUIT_RESET_TIMEOUT = 30
+_CACHE_CAPACITY = int(os.environ.get('COUNTRIES_API_CACHE_CAPACITY', 64))
+_CACHE_TTL = float(os.environ.get('COUNTRIES_API_CACHE_TTL', 3600))
+_DATA_SOURCE = os.environ.get('COUNTRIES_API_DATA_SOURCE', 'region')  # 'region' or 'snapshot'
+_SNAPSHOT_KEY = ('all', '')
+_SNAPSHOT_PATH = os.environ.get('COUNTRIES_API_SNAPSHOT_PATH')
+_COUNTRIES_API_HOST = os.environ.get('COUNTRIES_API_UPSTREAM_HOST', 'https://restcountries.com/v3.1')
 _COUNTRY_PARAMS = {'fields': ['name' ,'capital', 'region', 'subregion',
-                              'population', 'area', 'borders']}
+                              'population', 'area', 'borders', 'cca3']}
+_AREA_PARAMS = {'fields': ['region', 'subregion']}
+
+
+class UnknownAreaError(LookupError):
+    """
+    Exception raised when requested region or subregion is not present in the snapshot.
+    """
+
+
+class CountriesSnapshot:
+    """
+    Class representing immutable snapshot of data about all countries with indexes
+    by lower-cased region and subregion name and graph of borders. New snapshot is built completely before
+    it replaces the old one, so readers never see partially built indexes.
+    """
+    def __init__(self, countries: list, fetched_at: float | None = None) -> None:
+        """
+        :param countries: Records of all countries.
+        :param fetched_at: Unix time at which the data was retrieved, now by default.
+        """
+        expires_at = (time.time() if fetched_at is None else fetched_at) + _CACHE_TTL
+        regions = {}
+        subregions = {}
+        for country in countries:
+            regions.setdefault(country.region.lower(), []).append(country)
+            subregions.setdefault(country.subregion.lower(), []).append(country)
+
+        self.countries = countries
+        self.regions = {name: CountryGroup(members, expires_at=expires_at)
+                        for name, members in regions.items()}
+        self.subregions = {name: CountryGroup(members, expires_at=expires_at)
+                           for name, members in subregions.items()}
+        self.graph = BorderGraph(countries, expires_at=expires_at)
+
+    def region(self, region: str) -> CountryGroup:
+        """
+        Function that returns countries in specified region.
+        :param region: Region name
+        :return: Group of countries in region
+        """
+        try:
+            return self.regions[region.lower()]
+        except KeyError as error:
+            raise UnknownAreaError(f'Unknown region: {region}') from error
+
+    def subregion(self, subregion: str) -> CountryGroup:
+        """
+        Function that returns countries in specified subregion.
+        :param subregion: Subregion name
+        :return: Group of countries in subregion
+        """
+        try:
+            return self.subregions[subregion.lower()]
+        except KeyError as error:
+            raise UnknownAreaError(f'Unknown subregion: {subregion}') from error
+
+
+class UpstreamUnavailableError(requests.ConnectionError):
+    """
+    Exception raised without contacting remote host while the circuit breaker is open.
+    """
+
+
+class _CircuitBreaker:
+    """
+    Class representing circuit breaker guarding requests to remote host. After a number of
+    consecutive failures the circuit opens and requests fail fast. After reset timeout single
+    trial request is let through (half-open state) and its result closes or reopens the circuit.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        :param failure_threshold: Number of consecutive failures opening the circuit.
+        :param reset_timeout: Time in seconds after which trial request is let through.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """
+        Function that checks if request to remote host can be sent.
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+                return
+        raise UpstreamUnavailableError('Remote host is unavailable, circuit breaker is open')
+
+    def record_success(self) -> None:
+        """
+        Function that records successful request and closes the circuit.
+        """
+        with self._lock:
+            self._failures = 0
+            self.state = 'closed'
+
+    def record_failure(self) -> None:
+        """
+        Function that records failed request and opens the circuit if needed.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half-open' or self._failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """
+    Class representing client of remote API host. It keeps persistent connections in a pool,
+    retries requests failed due to connection errors or 5xx status codes with jittered
+    exponential backoff and stops contacting the host while it is unhealthy.
+    """
+    def __init__(self, pool_size: int = _UPSTREAM_POOL_SIZE, max_retries: int = _UPSTREAM_MAX_RETRIES,
+                 backoff_base: float = _UPSTREAM_BACKOFF_BASE, backoff_max: float = _UPSTREAM_BACKOFF_MAX,
+                 failure_threshold: int = _CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = _CIRCUIT_RESET_TIMEOUT, timeout: float = _REQUEST_TIMEOUT) -> None:
+        """
+        :param pool_size: Maximal number of persistent connections per host.
+        :param max_retries: Number of retries of failed request.
+        :param backoff_base: Base of exponential backoff between retries in seconds.
+        :param backoff_max: Maximal backoff between retries in seconds.
+        :param failure_threshold: Number of consecutive failures opening the circuit breaker.
+        :param reset_timeout: Time in seconds after which the circuit breaker lets trial request through.
+        :param timeout: Time in seconds after which request is considered not processed.
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._breaker = _CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._counters = {'requests': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def get_json(self, url: str, params: dict | None = None) -> dict | list:
+        """
+        Function that sends GET request to remote host and returns decoded JSON response.
+        Errors other than connection errors and timeouts (e.g. broken response body) are not retried,
+        but they are recorded as failures, so trial request in half-open state always closes or reopens the circuit.
+        :param url: URL of the resource.
+        :param params: Query parameters of the request.
+        :return: JSON like object (dictionary or list) containing retrieved data.
+        """
+        try:
+            self._breaker.before_request()
+        except UpstreamUnavailableError:
+            self._count('rejected')
+            raise
+
+        for attempt in range(self.max_retries + 1):
+            self._count('requests')
+            try:
+                response = self._session.get(url=url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as connection_error:
+                error = connection_error
+            except Exception:  # pylint: disable=broad-except
+                self._record_failure()
+                raise
+            else:
+                if response.status_code not in _UPSTREAM_RETRY_STATUS_CODES:
+                    self._breaker.record_success()
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f'{response.status_code} Server Error for url: {response.url}',
+                                           response=response)
+
+            if attempt < self.max_retries:
+                self._count('retries')
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+        self._record_failure()
+        raise error
+
+    def stats(self) -> dict:
+        """
+        Function that returns statistics of requests sent to remote host.
+        :return: Dictionary containing number of sent requests, retries, failures,
+                 requests rejected by the circuit breaker and state of the circuit breaker.
+        """
+        with self._lock:
+            return self._counters | {'circuit': self._breaker.state}
+
+    def _count(self, name: str) -> None:
+        """
+        Function that increments counter of requests, it is called concurrently by handler threads.
+        :param name: Name of the counter.
+        """
+        with self._lock:
+            self._counters[name] += 1
+
+    def _record_failure(self) -> None:
+        """
+        Function that counts failed retrieval and records it in the circuit breaker.
+        """
+        self._count('failures')
+        self._breaker.record_failure()
+
+
+class _SingleFlight:
+    """
+    Class that coalesces concurrent calls for the same key, so only the first caller
+    executes the function and all other callers wait for its result or error.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: tuple, function: callable) -> object:
+        """
+        Function that executes given function unless call for the same key is already
+        in progress, in which case it waits for the result of that call.
+        :param key: Key identifying the call.
+        :param function: Function without arguments to be executed.
+        :return: Result of the function.
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = {'done': threading.Event()}
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = function()
+        except Exception as error:
+            call['error'] = error
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call['done'].set()
+
+        return call['result']
+
+    def stats(self) -> dict:
+        """
+        Function that returns counters of executed and coalesced calls.
+        :return: Dictionary containing counters.
+        """
+        return {'calls': self.calls, 'coalesced': self.coalesced}
+
+
+_logger = logging.getLogger(__name__)
+_upstream_client = UpstreamClient()
+_single_flight = _SingleFlight()
+_countries_cache = TTLCache(capacity=_CACHE_CAPACITY, ttl=_CACHE_TTL)
+_upstream_latency = histogram('countries_api_upstream_request_duration_seconds',
+                              'Time of retrieving data from remote host, including retries.', ('outcome',))
+_upstream_errors = counter('countries_api_upstream_errors_total',
+                           'Failed retrievals of data from remote host by type of error.', ('error',))
 
 
 def _send_request(host: str = _COUNTRIES_API_HOST) -> dict | list:
@@ -17,10 +309,14 @@ def _send_request(host: str = _COUNTRIES_API_HOST) -> dict | list:
     :param: Remote API Host URL
     :return: JSON like object (dictionary or list) containing retrieved data.
     """
-
-    response = requests.get(url=host, timeout=_REQUEST_TIMEOUT, params=_COUNTRY_PARAMS)
-    response.raise_for_status()
-    data = response.json()
+    start = time.perf_counter()
+    try:
+        data = _upstream_client.get_json(url=host, params=_COUNTRY_PARAMS)
+    except Exception as error:
+        _upstream_latency.observe(time.perf_counter() - start, 'error')
+        _upstream_errors.inc(type(error).__name__)
+        raise
+    _upstream_latency.observe(time.perf_counter() - start, 'success')
     return data
 
 def _sanitize_data(data: list) -> list:
@@ -40,24 +336,243 @@ def _sanitize_data(data: list) -> list:
 
     return data
 
-@lru_cache(maxsize=_CACHE_CAPACITY)
+def _build_countries(data: list) -> list[Country]:
+    """
+    Function that converts sanitized data to immutable country records.
+    :param: Sanitized data
+    :return: List of country records
+    """
+    return [Country.from_dict(country) for country in data]
+
+def _fetch_countries(kind: str, name: str) -> CountryGroup:
+    """
+    Function that retrieves sanitized data about countries in specified region or subregion.
+    Concurrent calls for the same region or subregion share a single request to remote host.
+    The name is percent-encoded, so it always stays a single segment of the path.
+    :param kind: Either 'region' or 'subregion'
+    :param name: Region or subregion name
+    :return: Group of countries with precomputed results
+    """
+    def fetch() -> CountryGroup:
+        data = _send_request(host=f'{_COUNTRIES_API_HOST}/{kind}/{quote(name, safe="")}')
+        return CountryGroup(_build_countries(_sanitize_data(data)), expires_at=time.time() + _CACHE_TTL)
+
+    return _single_flight.do((kind, name), fetch)
+
+def _fetch_snapshot() -> CountriesSnapshot:
+    """
+    Function that retrieves data about all countries in a single request to remote host
+    and builds snapshot indexed by region and subregion.
+    :return: Snapshot of data about all countries
+    """
+    def fetch() -> CountriesSnapshot:
+        data = _sanitize_data(_send_request(host=f'{_COUNTRIES_API_HOST}/all'))
+        if _SNAPSHOT_PATH:
+            try:
+                save_snapshot(_SNAPSHOT_PATH, data)
+            except OSError as error:
+                _logger.warning('Saving snapshot to %s failed: %s', _SNAPSHOT_PATH, error)
+        return CountriesSnapshot(_build_countries(data))
+
+    return _single_flight.do(_SNAPSHOT_KEY, fetch)
+
+def restore_snapshot() -> bool:
+    """
+    Function that loads snapshot persisted in the snapshot file into the cache and starts
+    retrieving fresh snapshot from remote host in background. If the file is missing
+    or corrupted, the snapshot will be retrieved from remote host when first requested.
+    When data of regions and subregions is requested separately, the snapshot answers
+    requests for regions and subregions which are not cached yet (see _get_area_group).
+    :return: True if the snapshot was loaded from the file, False otherwise
+    """
+    if not _SNAPSHOT_PATH:
+        return False
+
+    try:
+        data, fetched_at = load_snapshot(_SNAPSHOT_PATH)
+    except SnapshotFileError as error:
+        _logger.warning('Snapshot not restored: %s', error)
+        return False
+
+    age = max(0.0, time.time() - fetched_at)
+    _countries_cache.put(_SNAPSHOT_KEY, CountriesSnapshot(_build_countries(data), fetched_at=fetched_at),
+                         loaded_at=time.monotonic() - age)
+    _countries_cache.refresh(_SNAPSHOT_KEY, _fetch_snapshot)
+    return True
+
+def prepare_shared_snapshot() -> None:
+    """
+    Function that retrieves snapshot of all countries and pins it in the cache, so every endpoint
+    is answered from it and the process never refreshes it on its own. It is used by pre-fork
+    supervisor before worker processes are started, so they share the snapshot instead of each
+    retrieving its own copy. If remote host is unavailable, currently pinned snapshot is kept or,
+    if there is none, snapshot is loaded from the snapshot file.
+    :raises RequestException: If remote host is unavailable and there is no snapshot to keep.
+    :raises SnapshotFileError: If remote host is unavailable and the snapshot file cannot be loaded.
+    """
+    global _DATA_SOURCE  # pylint: disable=global-statement
+    try:
+        snapshot = _fetch_snapshot()
+    except requests.RequestException as error:
+        if _countries_cache.peek(_SNAPSHOT_KEY) is not None or not _SNAPSHOT_PATH:
+            raise
+        _logger.warning('Retrieving snapshot failed, loading it from %s: %s', _SNAPSHOT_PATH, error)
+        data, fetched_at = load_snapshot(_SNAPSHOT_PATH)
+        snapshot = CountriesSnapshot(_build_countries(data), fetched_at=fetched_at)
+
+    _DATA_SOURCE = 'snapshot'
+    _countries_cache.ttl = math.inf
+    _countries_cache.put(_SNAPSHOT_KEY, snapshot)
+
+def get_snapshot() -> CountriesSnapshot:
+    """
+    Function that returns cached snapshot of data about all countries. Stale snapshot
+    is returned immediately and replaced in background.
+    :return: Snapshot of data about all countries
+    """
+    return _countries_cache.get(_SNAPSHOT_KEY, _fetch_snapshot)
+
+def list_areas() -> list[tuple[str, str]]:
+    """
+    Function that returns keys of data which can be prefetched: lower-cased names of all regions
+    and subregions known to remote host, retrieved in a single request for these two fields only.
+    In snapshot mode the only key is the snapshot of all countries.
+    :return: List of tuples of kind ('region', 'subregion' or 'all') and name
+    """
+    if _DATA_SOURCE == 'snapshot':
+        return [_SNAPSHOT_KEY]
+
+    data = _upstream_client.get_json(url=f'{_COUNTRIES_API_HOST}/all', params=_AREA_PARAMS)
+    regions = sorted({country['region'].lower() for country in data if country.get('region')})
+    subregions = sorted({country['subregion'].lower() for country in data if country.get('subregion')})
+    return [('region', name) for name in regions] + [('subregion', name) for name in subregions]
+
+def prefetch(kind: str, name: str) -> None:
+    """
+    Function that retrieves fresh data about countries in specified region or subregion,
+    or snapshot of all countries, and stores it in the cache before cached data expires.
+    :param kind: Either 'region', 'subregion' or 'all'
+    :param name: Region or subregion name, empty for snapshot
+    """
+    value = _fetch_snapshot() if (kind, name) == _SNAPSHOT_KEY else _fetch_countries(kind=kind, name=name)
+    _countries_cache.put((kind, name), value)
+
+def is_cached(kind: str, name: str) -> bool:
+    """
+    Function that checks if data about countries in specified region or subregion, or snapshot
+    of all countries, is cached, even if stale, or can be taken from cached snapshot, so it can be returned
+    without waiting for remote host.
+    :param kind: Either 'region', 'subregion' or 'all'
+    :param name: Region or subregion name, empty for snapshot
+    :return: True if the data is cached, False otherwise
+    """
+    if _DATA_SOURCE == 'snapshot' or kind == 'all':
+        return _countries_cache.peek(_SNAPSHOT_KEY) is not None
+    return _countries_cache.peek((kind, name)) is not None or _snapshot_group(kind=kind, name=name) is not None
+
+def get_border_graph() -> BorderGraph:
+    """
+    Function that returns graph of borders between all countries built from the snapshot
+    of all countries, also when data of regions and subregions is requested separately,
+    as neighbours may belong to other regions.
+    :return: Graph of borders
+    """
+    return get_snapshot().graph
+
+def get_single_flight_stats() -> dict:
+    """
+    Function that returns number of requests sent to remote host on behalf of callers
+    and number of callers that waited for already running request instead.
+    :return: Dictionary with 'calls' and 'coalesced' counters
+    """
+    return _single_flight.stats()
+
+def get_upstream_stats() -> dict:
+    """
+    Function that returns statistics of requests sent to remote host.
+    :return: Dictionary with requests, retries, failures and rejected counters and circuit breaker state
+    """
+    return _upstream_client.stats()
+
+def get_cache_stats() -> dict:
+    """
+    Function that returns statistics of the cache storing data retrieved from remote host.
+    :return: Dictionary with hits, misses, stale hits, evictions and failed refreshes counters
+    """
+    return _countries_cache.stats()
+
+def get_region_group(region: str) -> CountryGroup:
+    """
+    Function that returns countries in specified region with precomputed results.
+    Stale data is returned immediately and refreshed in background.
+    In snapshot mode data is taken from the snapshot of all countries.
+    :param region: Region name
+    :return: Group of countries in region
+    """
+    if _DATA_SOURCE == 'snapshot':
+        return get_snapshot().region(region)
+
+    return _get_area_group(kind='region', name=region)
+
+def get_subregion_group(subregion: str) -> CountryGroup:
+    """
+    Function that returns countries in specified subregion with precomputed results.
+    Stale data is returned immediately and refreshed in background.
+    In snapshot mode data is taken from the snapshot of all countries.
+    :param subregion: Subregion name
+    :return: Group of countries in subregion
+    """
+    if _DATA_SOURCE == 'snapshot':
+        return get_snapshot().subregion(subregion)
+
+    return _get_area_group(kind='subregion', name=subregion)
+
+def _get_area_group(kind: str, name: str) -> CountryGroup:
+    """
+    Function that returns cached countries in specified region or subregion. If they are not cached yet,
+    but the snapshot of all countries is (e.g. restored from the snapshot file or retrieved for graph
+    of borders), the group from the snapshot is cached as stale data, so it is returned immediately,
+    also when remote host is unavailable, and replaced with data retrieved from remote host in background.
+    :param kind: Either 'region' or 'subregion'
+    :param name: Region or subregion name
+    :return: Group of countries in region or subregion
+    """
+    key = (kind, name)
+    if _countries_cache.peek(key) is None and (group := _snapshot_group(kind=kind, name=name)) is not None:
+        _countries_cache.put(key, group, loaded_at=time.monotonic() - _countries_cache.ttl)
+
+    return _countries_cache.get(key, lambda: _fetch_countries(kind=kind, name=name))
+
+def _snapshot_group(kind: str, name: str) -> CountryGroup | None:
+    """
+    Function that returns countries in specified region or subregion from cached snapshot of all countries.
+    :param kind: Either 'region' or 'subregion'
+    :param name: Region or subregion name
+    :return: Group of countries or None if there is no cached snapshot or it does not contain the area
+    """
+    snapshot = _countries_cache.peek(_SNAPSHOT_KEY)
+    if snapshot is None:
+        return None
+    return (snapshot.regions if kind == 'region' else snapshot.subregions).get(name.lower())
+
 def send_region_request(region: str) -> list:
     """
     Function that sends REST API request to remote host in order
     to retrieve data about countries in specified region and caches it.
+    Stale data is returned immediately and refreshed in background.
+    In snapshot mode data is taken from the snapshot of all countries instead.
     :param region: Region name
-    :return : List of dictionaries containing information about countries in region
+    :return : List of records containing information about countries in region
     """
-    data = _send_request(host=f'{_COUNTRIES_API_HOST}/region/{region}')
-    return _sanitize_data(data)
+    return get_region_group(region).countries
 
-@lru_cache(maxsize=_CACHE_CAPACITY)
 def send_subregion_request(subregion: str) -> list:
     """
     Function that sends REST API request to remote host in order
     to retrieve data about countries in specified subregion and caches it.
+    Stale data is returned immediately and refreshed in background.
+    In snapshot mode data is taken from the snapshot of all countries instead.
     :param region: Subregion name
-    :return : List of dictionaries containing information about countries in subregion
+    :return : List of records containing information about countries in subregion
     """
-    data = _send_request(host=f'{_COUNTRIES_API_HOST}/subregion/{subregion}')
-    return _sanitize_data(data)
+    return get_subregion_group(subregion).countries
@@ -0,0 +1,406 @@
+"""
+This module contains counters and histograms exposed in Prometheus text format.
+
+Values are recorded without locks: every thread writes only its own shard of the values
+and shards are summed when the metrics are rendered. Shards of finished threads are
+folded into the totals, so short-lived threads do not accumulate.
+
+Worker processes of pre-fork server share their values through files in common directory
+(see share_metrics), so metrics of all workers are rendered whichever of them is scraped.
+"""
+from bisect import bisect_left
+import json
+import os
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERIALIZATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+_PUBLISH_INTERVAL = 1.0
+_WORKER_LABEL = 'worker'
+_SHARED_FILE_SUFFIX = '.json'
+
+
+class _Metric:
+    """
+    Class representing metric with values sharded per thread.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        """
+        :param name: Name of the metric.
+        :param documentation: Description of the metric.
+        :param labels: Names of labels of the metric.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def _shard(self) -> dict:
+        """
+        Function that returns values written by the current thread.
+        :return: Dictionary mapping tuple of label values to list of values.
+        """
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _zero(self) -> list:
+        """
+        Function that returns initial values for new set of label values.
+        """
+        return [0]
+
+    def collect(self) -> dict:
+        """
+        Function that sums values written by all threads.
+        :return: Dictionary mapping tuple of label values to list of values.
+        """
+        totals = {}
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                    _add_values(totals, dict(shard))
+                else:
+                    _add_values(self._retired, shard)
+            self._shards = alive
+            _add_values(totals, self._retired)
+        return totals
+
+    def render(self, samples: dict | None = None, worker: str | None = None) -> list[str]:
+        """
+        Function that renders samples of the metric.
+        :param samples: Values to be rendered as returned by collect, current values if None.
+        :param worker: Value of worker label added to every sample, no label if None.
+        :return: List of lines in Prometheus text format.
+        """
+        labels, extra_values = _worker_labels(self.labels, worker)
+        return [f'{self.name}{_format_labels(labels, label_values + extra_values)} {_format_value(values[0])}'
+                for label_values, values in sorted((self.collect() if samples is None else samples).items())]
+
+
+class Counter(_Metric):
+    """
+    Class representing monotonically increasing counter.
+    """
+    kind = 'counter'
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """
+        Function that increases the counter.
+        :param label_values: Values of labels in order of label names.
+        :param amount: Value added to the counter.
+        """
+        shard = self._shard()
+        values = shard.get(label_values)
+        if values is None:
+            values = shard[label_values] = self._zero()
+        values[0] += amount
+
+
+class Histogram(_Metric):
+    """
+    Class representing histogram of observed values with cumulative buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS) -> None:
+        """
+        :param name: Name of the metric.
+        :param documentation: Description of the metric.
+        :param labels: Names of labels of the metric.
+        :param buckets: Sorted upper bounds of buckets, +Inf bucket is added automatically.
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def _zero(self) -> list:
+        """
+        Function that returns initial bucket counts followed by +Inf bucket count and sum.
+        """
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Function that records observed value.
+        :param value: Observed value.
+        :param label_values: Values of labels in order of label names.
+        """
+        shard = self._shard()
+        values = shard.get(label_values)
+        if values is None:
+            values = shard[label_values] = self._zero()
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def render(self, samples: dict | None = None, worker: str | None = None) -> list[str]:
+        """
+        Function that renders buckets, sum and count of the histogram.
+        :param samples: Values to be rendered as returned by collect, current values if None.
+        :param worker: Value of worker label added to every sample, no label if None.
+        :return: List of lines in Prometheus text format.
+        """
+        names, extra_values = _worker_labels(self.labels, worker)
+        lines = []
+        for label_values, values in sorted((self.collect() if samples is None else samples).items()):
+            label_values += extra_values
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                labels = _format_labels(names + ('le',), label_values + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(names, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(values[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class _CallbackMetric:
+    """
+    Class representing metric whose values are read from existing statistics when rendered.
+    """
+    def __init__(self, name: str, documentation: str, kind: str, labels: tuple, function: callable) -> None:
+        """
+        :param name: Name of the metric.
+        :param documentation: Description of the metric.
+        :param kind: Type of the metric, i.e. 'counter' or 'gauge'.
+        :param labels: Names of labels of the metric.
+        :param function: Function without arguments returning dictionary mapping tuple of
+                         label values to value.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labels = labels
+        self.function = function
+
+    def collect(self) -> dict:
+        """
+        Function that reads current values.
+        :return: Dictionary mapping tuple of label values to single element list with the value.
+        """
+        return {label_values: [value] for label_values, value in self.function().items()}
+
+    def render(self, samples: dict | None = None, worker: str | None = None) -> list[str]:
+        """
+        Function that renders values.
+        :param samples: Values to be rendered as returned by collect, current values if None.
+        :param worker: Value of worker label added to every sample, no label if None.
+        :return: List of lines in Prometheus text format.
+        """
+        labels, extra_values = _worker_labels(self.labels, worker)
+        return [f'{self.name}{_format_labels(labels, label_values + extra_values)} {_format_value(values[0])}'
+                for label_values, values in sorted((self.collect() if samples is None else samples).items())]
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+_shared_directory = None
+
+
+def _register(metric: _Metric | _CallbackMetric) -> _Metric | _CallbackMetric:
+    """
+    Function that adds metric to the registry. Metric registered again under the same name
+    replaces the previous one.
+    :param metric: Metric to be registered.
+    :return: Registered metric.
+    """
+    with _registry_lock:
+        _registry[metric.name] = metric
+    return metric
+
+def counter(name: str, documentation: str, labels: tuple = ()) -> Counter:
+    """
+    Function that creates and registers counter.
+    :param name: Name of the metric.
+    :param documentation: Description of the metric.
+    :param labels: Names of labels of the metric.
+    :return: Registered counter.
+    """
+    return _register(Counter(name, documentation, labels))
+
+def histogram(name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    """
+    Function that creates and registers histogram.
+    :param name: Name of the metric.
+    :param documentation: Description of the metric.
+    :param labels: Names of labels of the metric.
+    :param buckets: Sorted upper bounds of buckets.
+    :return: Registered histogram.
+    """
+    return _register(Histogram(name, documentation, labels, buckets))
+
+def register_callback(name: str, documentation: str, kind: str, labels: tuple, function: callable) -> None:
+    """
+    Function that registers metric read from existing statistics when rendered.
+    :param name: Name of the metric.
+    :param documentation: Description of the metric.
+    :param kind: Type of the metric, i.e. 'counter' or 'gauge'.
+    :param labels: Names of labels of the metric.
+    :param function: Function without arguments returning dictionary mapping tuple of label values to value.
+    """
+    _register(_CallbackMetric(name, documentation, kind, labels, function))
+
+def render_metrics() -> str:
+    """
+    Function that renders all registered metrics. If metrics are shared between worker processes,
+    values of every worker are rendered with worker label holding its process ID.
+    :return: Metrics in Prometheus text exposition format, without trailing new line.
+    """
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+
+    if _shared_directory is None:
+        workers = [(None, {metric.name: metric.collect() for metric in metrics})]
+    else:
+        workers = [(str(os.getpid()), {metric.name: metric.collect() for metric in metrics})] + _read_shared()
+
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {_escape(metric.documentation, quote=False)}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for worker, samples in workers:
+            if metric.name in samples:
+                lines.extend(metric.render(samples[metric.name], worker))
+    return '\n'.join(lines)
+
+def share_metrics(directory: str) -> None:
+    """
+    Function that shares metrics of this worker process with other worker processes of pre-fork
+    server. Values are written to file named after process ID in given directory every
+    _PUBLISH_INTERVAL seconds and rendered metrics contain values from files of all workers,
+    so it does not matter which worker answers the scrape. Files of exited workers have to be
+    removed by the supervisor (see remove_shared_metrics).
+    :param directory: Directory shared by worker processes.
+    """
+    global _shared_directory  # pylint: disable=global-statement
+    _shared_directory = directory
+    threading.Thread(target=_publish_periodically, daemon=True).start()
+
+def remove_shared_metrics(directory: str, pid: int) -> None:
+    """
+    Function that removes shared metrics of exited worker process.
+    :param directory: Directory shared by worker processes.
+    :param pid: Process ID of the worker.
+    """
+    path = os.path.join(directory, f'{pid}{_SHARED_FILE_SUFFIX}')
+    for leftover in (path, f'{path}.tmp'):
+        try:
+            os.remove(leftover)
+        except FileNotFoundError:
+            pass
+
+def _publish_periodically() -> None:
+    """
+    Function executed by background thread of worker process, it writes current values
+    to the shared directory until the process exits.
+    """
+    while True:
+        try:
+            _publish()
+        except OSError:
+            pass
+        time.sleep(_PUBLISH_INTERVAL)
+
+def _publish() -> None:
+    """
+    Function that writes current values of all metrics to the file of this process. The file is
+    replaced atomically, so readers never see partially written values.
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+    values = {metric.name: [[list(label_values), values] for label_values, values in metric.collect().items()]
+              for metric in metrics}
+
+    path = os.path.join(_shared_directory, f'{os.getpid()}{_SHARED_FILE_SUFFIX}')
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(values, file)
+    os.replace(temporary_path, path)
+
+def _read_shared() -> list[tuple[str, dict]]:
+    """
+    Function that reads values published by other worker processes.
+    :return: List of tuples of worker process ID and dictionary mapping metric name to its values.
+    """
+    own_file = f'{os.getpid()}{_SHARED_FILE_SUFFIX}'
+    try:
+        names = sorted(name for name in os.listdir(_shared_directory)
+                       if name.endswith(_SHARED_FILE_SUFFIX) and name != own_file)
+    except OSError:
+        return []
+
+    workers = []
+    for name in names:
+        try:
+            with open(os.path.join(_shared_directory, name), encoding='utf-8') as file:
+                values = json.load(file)
+        except (OSError, ValueError):
+            continue
+        workers.append((name.removesuffix(_SHARED_FILE_SUFFIX),
+                        {metric: {tuple(label_values): samples for label_values, samples in series}
+                         for metric, series in values.items()}))
+    return workers
+
+def _add_values(totals: dict, values: dict) -> None:
+    """
+    Function that adds values of one shard to totals.
+    :param totals: Dictionary mapping tuple of label values to list of values, updated in place.
+    :param values: Dictionary mapping tuple of label values to list of values.
+    """
+    for label_values, shard_values in values.items():
+        shard_values = list(shard_values)
+        total = totals.get(label_values)
+        if total is None:
+            totals[label_values] = shard_values
+        else:
+            for index, value in enumerate(shard_values):
+                total[index] += value
+
+def _worker_labels(names: tuple, worker: str | None) -> tuple[tuple, tuple]:
+    """
+    Function that adds worker label to names of labels of a metric.
+    :param names: Names of labels.
+    :param worker: Value of worker label, no label is added if None.
+    :return: Tuple of names of labels and values appended to label values of every sample.
+    """
+    return (names, ()) if worker is None else (names + (_WORKER_LABEL,), (worker,))
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    """
+    Function that formats labels of a sample.
+    :param names: Names of labels.
+    :param values: Values of labels.
+    :return: Labels in curly brackets, empty string if there are no labels.
+    """
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + '}'
+
+def _format_value(value: float | str) -> str:
+    """
+    Function that formats value of a sample or bucket bound.
+    """
+    if isinstance(value, float):
+        return repr(int(value)) + '.0' if value.is_integer() else repr(value)
+    return str(value)
+
+def _escape(value: str, quote: bool = True) -> str:
+    """
+    Function that escapes backslashes, new lines and (in label values) double quotes.
+    """
+    value = value.replace('\\', '\\\\').replace('\n', '\\n')
+    return value.replace('"', '\\"') if quote else value
@@ -0,0 +1,210 @@
+"""
+This module contains definitions of classes holding results precomputed for countries in single region
+or subregion and for the graph of borders between all countries.
+"""
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+import itertools
+from src.country import AnnotatedCountry
+from src.query import CountryQuery
+
+_INDEXED_FIELDS = ('name', 'population', 'area', 'borders')
+_TOTAL_POPULATION_FIELD = 'Total subregion population'
+
+
+class UnknownCountryError(LookupError):
+    """
+    Exception raised when requested country code is not present in the graph of borders.
+    """
+
+
+class _SortedIndex:
+    """
+    Class representing positions of countries sorted by single field. Countries with equal
+    values keep their original order in both ascending and descending order.
+    """
+    __slots__ = ('keys', 'ascending', 'descending', 'sorted_keys')
+
+    def __init__(self, keys: list) -> None:
+        """
+        :param keys: Values of the field of countries in original order.
+        """
+        self.keys = keys
+        self.ascending = sorted(range(len(keys)), key=keys.__getitem__)
+        self.descending = sorted(range(len(keys)), key=keys.__getitem__, reverse=True)
+        self.sorted_keys = [keys[position] for position in self.ascending]
+
+    def bounds(self, low: float | None, high: float | None) -> tuple[int, int]:
+        """
+        Function that finds part of ascending order with values in inclusive range in logarithmic time.
+        :param low: Minimal value, None for no bound.
+        :param high: Maximal value, None for no bound.
+        :return: Tuple of start and stop of the part.
+        """
+        start = 0 if low is None else bisect_left(self.sorted_keys, low)
+        stop = len(self.keys) if high is None else bisect_right(self.sorted_keys, high)
+        return start, max(start, stop)
+
+    def positions(self, low: float | None, high: float | None, descending: bool = False) -> Iterator[int]:
+        """
+        Generator returning positions of countries with values in inclusive range in given order,
+        without copying the whole part of the index.
+        :param low: Minimal value, None for no bound.
+        :param high: Maximal value, None for no bound.
+        :param descending: Flag indicating if countries are returned from the biggest value.
+        :return: Iterator of positions of countries.
+        """
+        start, stop = self.bounds(low, high)
+        if descending:
+            order, start, stop = self.descending, len(self.keys) - stop, len(self.keys) - start
+        else:
+            order = self.ascending
+        return (order[index] for index in range(start, stop))
+
+
+class CountryGroup:
+    """
+    Class representing countries in single region or subregion together with results
+    computed once when the data is loaded: indexes sorted by name, population, area and
+    number of borders and total population. Stored lists must not be modified.
+    """
+    def __init__(self, countries: list, expires_at: float = 0.0) -> None:
+        """
+        :param countries: Country records in region or subregion.
+        :param expires_at: Unix time at which the data becomes stale.
+        """
+        self.countries = countries
+        self.expires_at = expires_at
+        self.indexes = {field: _SortedIndex([_sort_key(country, field) for country in countries])
+                        for field in _INDEXED_FIELDS}
+        self.total_population = sum(country.population for country in countries)
+        self.with_total_population = [AnnotatedCountry(country, {_TOTAL_POPULATION_FIELD: self.total_population})
+                                      for country in countries]
+
+    def query(self, query: CountryQuery) -> list:
+        """
+        Function that returns countries matching the query. Countries are taken from the index
+        of the sort field, starting at the bound of its range found with binary search, and
+        reading stops when the limit is reached. Without sort field only countries in range
+        of the most selective filter are checked and they are returned in original order.
+        :param query: Query to be answered.
+        :return: List of country records, annotated with total population if it is requested,
+                 or dictionaries if projection is requested.
+        """
+        rows = self.with_total_population if query.with_total_population else self.countries
+        rows = [rows[position] for position in itertools.islice(self._select(query), query.limit)]
+        if query.fields is None:
+            return rows
+
+        fields = query.fields + ((_TOTAL_POPULATION_FIELD,) if query.with_total_population else ())
+        return [{field: row[field] for field in fields} for row in rows]
+
+    def _select(self, query: CountryQuery) -> Iterable[int]:
+        """
+        Function that selects positions of countries matching filters of the query in requested order.
+        :param query: Query to be answered.
+        :return: Iterable of positions of countries.
+        """
+        if query.sort is not None:
+            low, high = query.ranges.get(query.sort, (None, None))
+            candidates = self.indexes[query.sort].positions(low, high, descending=query.order == 'desc')
+            filters = {field: bounds for field, bounds in query.ranges.items() if field != query.sort}
+        elif query.ranges:
+            field = min(query.ranges, key=lambda name: _width(self.indexes[name].bounds(*query.ranges[name])))
+            candidates = sorted(self.indexes[field].positions(*query.ranges[field]))
+            filters = {name: bounds for name, bounds in query.ranges.items() if name != field}
+        else:
+            return range(len(self.countries))
+
+        checks = [(self.indexes[field].keys, low, high) for field, (low, high) in filters.items()]
+        return (position for position in candidates
+                if all((low is None or keys[position] >= low) and (high is None or keys[position] <= high)
+                       for keys, low, high in checks))
+
+
+class BorderGraph:
+    """
+    Class representing graph of land borders between countries built once when the data is loaded.
+    Countries are identified by their three-letter codes (cca3) and adjacency lists hold positions
+    of neighbours in the list of countries, so traversals do not look up codes. Total population
+    of neighbours is precomputed. Border codes of countries missing in the data are ignored, unlike
+    in the 'borders' index of CountryGroup used by min_borders and max_borders filters, which counts
+    all border codes of the country. Stored lists must not be modified.
+    """
+    def __init__(self, countries: list, expires_at: float = 0.0) -> None:
+        """
+        :param countries: Country records of all countries.
+        :param expires_at: Unix time at which the data becomes stale.
+        """
+        self.countries = countries
+        self.expires_at = expires_at
+        self.positions = {country.code: position for position, country in enumerate(countries) if country.code}
+        self.adjacency = [tuple(self.positions[code] for code in country.borders if code in self.positions)
+                          for country in countries]
+        self.neighbours_population = [sum(countries[position].population for position in neighbours)
+                                      for neighbours in self.adjacency]
+
+    def position(self, code: str) -> int:
+        """
+        Function that returns position of the country in the list of countries.
+        :param code: Three-letter code of the country, case insensitive.
+        :return: Position of the country.
+        :raises UnknownCountryError: If there is no country with given code.
+        """
+        try:
+            return self.positions[code.upper()]
+        except KeyError as error:
+            raise UnknownCountryError(f'Unknown country code: {code}') from error
+
+    def neighbours(self, code: str) -> tuple[list, int]:
+        """
+        Function that returns direct neighbours of the country.
+        :param code: Three-letter code of the country.
+        :return: Tuple containing list of country records of neighbours and their total population.
+        """
+        position = self.position(code)
+        return [self.countries[neighbour] for neighbour in self.adjacency[position]], \
+            self.neighbours_population[position]
+
+    def neighbourhood(self, code: str, hops: int) -> tuple[list, int]:
+        """
+        Function that returns countries reachable from the country by crossing at most given number
+        of borders, found with breadth-first search. Countries are ordered by number of crossed borders.
+        :param code: Three-letter code of the country, which is not included in the result.
+        :param hops: Maximal number of crossed borders.
+        :return: Tuple containing list of tuples of country record and number of crossed borders
+                 and total population of the countries.
+        """
+        start = self.position(code)
+        visited = bytearray(len(self.countries))
+        visited[start] = 1
+        frontier = [start]
+        reached = []
+        for distance in range(1, hops + 1):
+            next_frontier = []
+            for position in frontier:
+                for neighbour in self.adjacency[position]:
+                    if not visited[neighbour]:
+                        visited[neighbour] = 1
+                        next_frontier.append(neighbour)
+            if not next_frontier:
+                break
+            reached.extend((self.countries[position], distance) for position in next_frontier)
+            frontier = next_frontier
+        return reached, sum(country.population for country, _ in reached)
+
+
+def _sort_key(country: object, field: str) -> object:
+    """
+    Function that returns value of the country used to sort and filter by given field.
+    :param country: Country record.
+    :param field: Indexed field, number of borders is used for 'borders'.
+    :return: Value of the field.
+    """
+    return len(country.borders) if field == 'borders' else getattr(country, field)
+
+def _width(bounds: tuple[int, int]) -> int:
+    """
+    Function that returns number of countries between bounds of an index.
+    """
+    return bounds[1] - bounds[0]
@@ -0,0 +1,234 @@
+"""
+This module contains definition of the supervisor of pre-forked server processes used to serve
+Countries API on many CPU cores.
+"""
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from src.metrics import remove_shared_metrics, share_metrics
+from src.serving import PooledHTTPServer
+
+_PROCESSES_NUMBER = os.cpu_count() or 1
+_RELOAD_INTERVAL = float(os.environ.get('COUNTRIES_API_RELOAD_INTERVAL', 3600))
+_RELOAD_RETRY_DELAY = 30
+_GRACEFUL_TIMEOUT = 30
+_SUPERVISOR_INTERVAL = 0.5
+
+_logger = logging.getLogger(__name__)
+
+
+class PreforkSupervisor:
+    """
+    Class representing supervisor of worker processes serving connections from single listening
+    socket inherited from the supervisor. Data prepared by the supervisor before the workers are
+    forked is shared by them copy-on-write and kept out of garbage collector (gc.freeze), so its
+    memory pages are not copied. Workers which exit unexpectedly are replaced. After data is
+    reloaded (every reload interval or on SIGHUP) workers are restarted gracefully: new workers
+    are started with new data and old ones finish requests in progress before they exit.
+    SIGTERM and SIGINT stop all workers gracefully. Workers share their metrics through files
+    in temporary directory owned by the supervisor.
+    """
+    def __init__(self, server_address: tuple[str, int], handler_class: type,
+                 processes: int = _PROCESSES_NUMBER, prepare: callable = None,
+                 reload_interval: float | None = _RELOAD_INTERVAL, **server_options) -> None:
+        """
+        :param server_address: Tuple containing address and port the server listens on.
+        :param handler_class: Class handling the requests.
+        :param processes: Number of worker processes.
+        :param prepare: Function without arguments loading data shared by workers, called before
+                        the workers are started and before every graceful restart.
+        :param reload_interval: Time in seconds between graceful restarts with reloaded data,
+                                None disables periodic restarts.
+        :param server_options: Keyword arguments of PooledHTTPServer used by each worker, e.g. workers.
+        """
+        self.server_address = server_address
+        self.handler_class = handler_class
+        self.processes = processes
+        self.prepare = prepare
+        self.reload_interval = reload_interval
+        self.server_options = server_options
+        self.socket = None
+        self._metrics_directory = None
+        self._workers = {}
+        self._retiring = {}
+        self._stopping = False
+        self._reload_requested = False
+        self._next_reload = None
+
+    def serve_forever(self) -> None:
+        """
+        Function that prepares data, starts worker processes and supervises them until SIGTERM
+        or SIGINT is received.
+        """
+        self._prepare_data()
+        self._metrics_directory = tempfile.mkdtemp(prefix='countries-api-metrics-')
+        self.socket = socket.create_server(self.server_address, backlog=socket.SOMAXCONN)
+        self.socket.setblocking(False)
+        self.server_address = self.socket.getsockname()[:2]
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        try:
+            for _ in range(self.processes):
+                self._start_worker()
+            _logger.info('Serving on %s:%s with %s worker processes', *self.server_address, self.processes)
+
+            while not self._stopping:
+                self._reap_workers()
+                if self._reload_requested or (self._next_reload is not None and time.monotonic() >= self._next_reload):
+                    self._reload()
+                time.sleep(_SUPERVISOR_INTERVAL)
+        finally:
+            self._stop_workers()
+            self.socket.close()
+            shutil.rmtree(self._metrics_directory, ignore_errors=True)
+
+    def _prepare_data(self) -> None:
+        """
+        Function that loads data shared by workers and freezes all objects existing in the
+        supervisor, so garbage collector in workers does not touch their memory pages.
+        """
+        gc.unfreeze()
+        if self.prepare is not None:
+            self.prepare()
+        gc.collect()
+        gc.freeze()
+        if self.reload_interval is not None:
+            self._next_reload = time.monotonic() + self.reload_interval
+
+    def _reload(self) -> None:
+        """
+        Function that reloads shared data and restarts workers gracefully. If loading fails,
+        workers keep the current data and loading is retried later.
+        """
+        self._reload_requested = False
+        try:
+            self._prepare_data()
+        except Exception as error:  # pylint: disable=broad-except
+            _logger.warning('Reloading data failed, workers keep current data: %s', error)
+            self._next_reload = time.monotonic() + _RELOAD_RETRY_DELAY
+            return
+
+        for pid in list(self._workers):
+            self._start_worker()
+            self._retire_worker(pid)
+        _logger.info('Workers restarted with reloaded data')
+
+    def _start_worker(self) -> None:
+        """
+        Function that forks new worker process.
+        """
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self._workers[pid] = time.monotonic()
+
+    def _retire_worker(self, pid: int) -> None:
+        """
+        Function that asks worker process to finish requests in progress and exit.
+        :param pid: Process ID of the worker.
+        """
+        self._workers.pop(pid, None)
+        self._retiring[pid] = time.monotonic() + _GRACEFUL_TIMEOUT
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _reap_workers(self) -> None:
+        """
+        Function that collects exited worker processes, replaces the ones which exited unexpectedly
+        and kills retiring ones which did not exit in time.
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            remove_shared_metrics(self._metrics_directory, pid)
+            if self._retiring.pop(pid, None) is None and self._workers.pop(pid, None) is not None:
+                _logger.warning('Worker %s exited with code %s, starting new one', pid,
+                                os.waitstatus_to_exitcode(status))
+                if not self._stopping:
+                    self._start_worker()
+
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now >= deadline:
+                _logger.warning('Worker %s did not exit in time, killing it', pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self._retiring[pid] = float('inf')
+
+    def _stop_workers(self) -> None:
+        """
+        Function that stops all workers gracefully and waits until they exit.
+        """
+        for pid in list(self._workers):
+            self._retire_worker(pid)
+        while self._retiring:
+            self._reap_workers()
+            time.sleep(_SUPERVISOR_INTERVAL / 10)
+
+    def _run_worker(self) -> None:
+        """
+        Function executed by worker process, it serves connections from the inherited socket until
+        SIGTERM is received or the supervisor exits. It never returns.
+        """
+        exit_code = 0
+        supervisor_pid = os.getppid()
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            httpd = PooledHTTPServer(self.server_address, self.handler_class, bind_and_activate=False,
+                                     **self.server_options)
+            httpd.socket.close()
+            httpd.socket = self.socket
+            share_metrics(self._metrics_directory)
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=httpd.shutdown, daemon=True).start())
+            threading.Thread(target=self._watch_supervisor, args=(supervisor_pid, httpd), daemon=True).start()
+            try:
+                httpd.serve_forever()
+            finally:
+                httpd.server_close()
+        except Exception:  # pylint: disable=broad-except
+            _logger.exception('Worker %s failed', os.getpid())
+            exit_code = 1
+        finally:
+            logging.shutdown()
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _watch_supervisor(self, supervisor_pid: int, httpd: PooledHTTPServer) -> None:
+        """
+        Function executed by thread of worker process, it stops the worker when the supervisor
+        exits without stopping it (e.g. when it is killed), so orphaned workers do not keep serving.
+        :param supervisor_pid: Process ID of the supervisor.
+        :param httpd: Server of the worker.
+        """
+        while os.getppid() == supervisor_pid:
+            time.sleep(_SUPERVISOR_INTERVAL)
+        httpd.shutdown()
+
+    def _request_stop(self, *_) -> None:
+        """
+        Function handling SIGTERM and SIGINT in the supervisor.
+        """
+        self._stopping = True
+
+    def _request_reload(self, *_) -> None:
+        """
+        Function handling SIGHUP in the supervisor.
+        """
+        self._reload_requested = True
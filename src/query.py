@@ -0,0 +1,134 @@
+"""
+This module contains definition of query selecting, sorting and projecting countries of single region or subregion.
+"""
+import math
+
+_SORT_FIELDS = ('name', 'population', 'area', 'borders')
+_RANGE_FIELDS = ('population', 'area', 'borders')
+_PROJECTION_FIELDS = ('name', 'capital', 'region', 'subregion', 'borders', 'area', 'population')
+_ORDERS = ('asc', 'desc')
+_TRUE_VALUES = ('1', 'true', 'yes')
+_FALSE_VALUES = ('0', 'false', 'no')
+
+
+class QueryError(ValueError):
+    """
+    Exception raised when query parameters are invalid.
+    """
+
+
+class CountryQuery:
+    """
+    Class representing immutable query for countries of single region or subregion. Countries
+    are filtered with inclusive ranges of population, area and number of borders, sorted by
+    given field ('borders' sorts by number of borders) and limited. Selected fields are
+    returned if projection is given, the total population of the group can be attached.
+    """
+    __slots__ = ('sort', 'order', 'limit', 'ranges', 'fields', 'with_total_population')
+
+    def __init__(self, sort: str | None = None, order: str = 'asc', limit: int | None = None,
+                 ranges: dict | None = None, fields: tuple | None = None,
+                 with_total_population: bool = False) -> None:
+        """
+        :param sort: Field countries are sorted by, original order is kept if None.
+        :param order: Either 'asc' or 'desc'.
+        :param limit: Maximal number of returned countries, all of them if None.
+        :param ranges: Dictionary mapping field to tuple of minimal and maximal value, None for no bound.
+        :param fields: Names of returned fields, whole records if None.
+        :param with_total_population: Flag indicating if total population of the group is attached.
+        """
+        ranges = {field: bounds for field, bounds in (ranges or {}).items() if bounds != (None, None)}
+        if sort is not None and sort not in _SORT_FIELDS:
+            raise QueryError(f'Unsupported sort field: {sort}, use one of: {", ".join(_SORT_FIELDS)}')
+        if order not in _ORDERS:
+            raise QueryError(f'Unsupported order: {order}, use either "asc" or "desc"')
+        if limit is not None and limit < 0:
+            raise QueryError('Limit must not be negative')
+        if unknown := set(ranges) - set(_RANGE_FIELDS):
+            raise QueryError(f'Unsupported range field: {", ".join(sorted(unknown))}')
+        if not_finite := sorted(field for field, bounds in ranges.items()
+                                if any(bound is not None and not math.isfinite(bound) for bound in bounds)):
+            raise QueryError(f'Bounds of {", ".join(not_finite)} must be finite numbers')
+        if fields is not None and not fields:
+            raise QueryError('At least one field must be selected')
+        if fields is not None and (unknown := set(fields) - set(_PROJECTION_FIELDS)):
+            raise QueryError(f'Unsupported field: {", ".join(sorted(unknown))}')
+
+        for name, value in (('sort', sort), ('order', order), ('limit', limit), ('ranges', ranges),
+                            ('fields', None if fields is None else tuple(dict.fromkeys(fields))),
+                            ('with_total_population', with_total_population)):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_params(cls, params: dict) -> 'CountryQuery':
+        """
+        Function that creates query from parameters of query string: sort, order, limit,
+        min_population, max_population, min_area, max_area, min_borders, max_borders,
+        fields (comma separated) and with_total_population.
+        :param params: Dictionary mapping parameter name to list of values (as returned by parse_qs).
+        :return: Country query.
+        :raises QueryError: If any parameter is unknown or has invalid value.
+        """
+        values = {}
+        for name, value in params.items():
+            if len(value) != 1:
+                raise QueryError(f'Parameter {name} must be given once')
+            values[name] = value[0]
+
+        ranges = {field: (_parse_number(values, f'min_{field}'), _parse_number(values, f'max_{field}'))
+                  for field in _RANGE_FIELDS}
+        query = cls(sort=values.pop('sort', None) or None, order=values.pop('order', 'asc').lower(),
+                    limit=_parse_number(values, 'limit', integer=True), ranges=ranges,
+                    fields=tuple(field.strip() for field in values.pop('fields').split(',') if field.strip())
+                    if 'fields' in values else None,
+                    with_total_population=_parse_flag(values, 'with_total_population'))
+        if values:
+            raise QueryError(f'Unsupported parameter: {", ".join(sorted(values))}')
+        return query
+
+    @property
+    def key(self) -> tuple:
+        """
+        Tuple identifying the query, equal for equal queries.
+        """
+        return (self.sort, self.order, self.limit, tuple(sorted(self.ranges.items())), self.fields,
+                self.with_total_population)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError('Country query is immutable')
+
+    def __repr__(self) -> str:
+        return f'CountryQuery{self.key!r}'
+
+
+def _parse_number(values: dict, name: str, integer: bool = False) -> float | int | None:
+    """
+    Function that removes numeric parameter from parameters and converts it.
+    :param values: Dictionary mapping parameter name to value.
+    :param name: Name of the parameter.
+    :param integer: Flag indicating if the value has to be an integer.
+    :return: Value of the parameter or None if it is not present.
+    :raises QueryError: If the value is not a number.
+    """
+    value = values.pop(name, '')
+    if value == '':
+        return None
+    try:
+        return int(value) if integer else float(value)
+    except ValueError as error:
+        raise QueryError(f'Parameter {name} must be {"an integer" if integer else "a number"}') from error
+
+def _parse_flag(values: dict, name: str) -> bool:
+    """
+    Function that removes boolean parameter from parameters and converts it.
+    :param values: Dictionary mapping parameter name to value.
+    :param name: Name of the parameter.
+    :return: Value of the parameter, False if it is not present.
+    :raises QueryError: If the value is not a boolean.
+    """
+    value = values.pop(name, '').lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES or value == '':
+        return False
+    raise QueryError(f'Parameter {name} must be either "true" or "false"')
@@ -0,0 +1,175 @@
+"""
+This module contains definition of the cache of encoded responses of Countries API endpoints.
+"""
+from collections import OrderedDict
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+
+_IDENTITY = 'identity'
+_MIN_COMPRESSED_SIZE = 256
+_COMPRESSION_LEVEL = 6
+_DEFAULT_CONTENT_TYPE = 'application/json'
+_COMPRESSORS = {'gzip': lambda body: gzip.compress(body, compresslevel=_COMPRESSION_LEVEL, mtime=0),
+                'deflate': lambda body: zlib.compress(body, _COMPRESSION_LEVEL)}
+
+
+class EncodedResponse:
+    """
+    Class representing encoded body of the response together with its strong entity tag.
+    Bodies big enough to benefit from compression are compressed once with every supported
+    content coding, each compressed representation has its own entity tag.
+    """
+    __slots__ = ('body', 'etag', 'expires_at', 'content_type', '_representations')
+
+    def __init__(self, body: bytes, expires_at: float, content_type: str = _DEFAULT_CONTENT_TYPE) -> None:
+        """
+        :param body: Encoded body of the response.
+        :param expires_at: Unix time at which data the response was built from becomes stale.
+        :param content_type: Value of Content-Type header of the response.
+        """
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.expires_at = expires_at
+        self.content_type = content_type
+        self._representations = {_IDENTITY: (body, self.etag)}
+        if len(body) >= _MIN_COMPRESSED_SIZE:
+            for coding, compress in _COMPRESSORS.items():
+                self._representations[coding] = (compress(body), f'{self.etag[:-1]}-{coding}"')
+
+    def representation(self, coding: str) -> tuple[bytes, str]:
+        """
+        Function that returns body and entity tag of the response in given content coding.
+        :param coding: Content coding, i.e. 'gzip', 'deflate' or 'identity'.
+        :return: Tuple containing body and entity tag, uncompressed if the coding is not available.
+        """
+        return self._representations.get(coding, self._representations[_IDENTITY])
+
+    def codings(self) -> tuple[str, ...]:
+        """
+        Function that returns content codings in which the response is available.
+        :return: Tuple of content codings.
+        """
+        return tuple(self._representations)
+
+    def max_age(self) -> int:
+        """
+        Function that returns number of seconds for which the response can be cached by clients.
+        :return: Number of seconds until data becomes stale, 0 if it is already stale.
+        """
+        return max(0, int(self.expires_at - time.time()))
+
+    def matches(self, if_none_match: str | None, coding: str = _IDENTITY) -> bool:
+        """
+        Function that checks if value of If-None-Match header matches entity tag of the response.
+        :param if_none_match: Value of If-None-Match header.
+        :param coding: Content coding of the representation sent to the client.
+        :return: True if client already has this response, False otherwise.
+        """
+        if not if_none_match:
+            return False
+
+        _, own_etag = self.representation(coding)
+        for etag in if_none_match.split(','):
+            etag = etag.strip()
+            if etag == '*' or etag.removeprefix('W/') == own_etag:
+                return True
+        return False
+
+
+def negotiate_coding(accept_encoding: str | None, available: tuple[str, ...]) -> str:
+    """
+    Function that selects content coding of the response according to Accept-Encoding header.
+    :param accept_encoding: Value of Accept-Encoding header.
+    :param available: Content codings in which the response is available.
+    :return: Content coding with the highest quality value, 'identity' if none is acceptable.
+    """
+    if not accept_encoding:
+        return _IDENTITY
+
+    qualities = {}
+    for item in accept_encoding.lower().split(','):
+        coding, _, parameters = item.strip().partition(';')
+        quality = 1.0
+        name, _, value = parameters.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip()] = quality
+
+    best_coding, best_quality = _IDENTITY, 0.0
+    for coding in available:
+        if coding == _IDENTITY:
+            continue
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best_coding, best_quality = coding, quality
+    return best_coding
+
+
+class ResponseCache:
+    """
+    Class representing least recently used cache of encoded responses. Each response is stored
+    together with the data it was built from and it is encoded again once the data changes.
+    """
+    def __init__(self, capacity: int) -> None:
+        """
+        :param capacity: Maximal number of stored responses.
+        """
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def lookup(self, key: tuple, source: object) -> EncodedResponse | None:
+        """
+        Function that returns cached response for the key if it was built from given source.
+        :param key: Key of the response, i.e. tuple of endpoint, parameter and format.
+        :param source: Object holding the data the response is built from.
+        :return: Encoded response or None if there is no valid response in the cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry[1]
+            self._counters['invalidations' if entry is not None else 'misses'] += 1
+        return None
+
+    def store(self, key: tuple, source: object, response: EncodedResponse) -> EncodedResponse:
+        """
+        Function that stores response built from given source and evicts least recently
+        used responses if the capacity is exceeded.
+        :param key: Key of the response, i.e. tuple of endpoint, parameter and format.
+        :param source: Object holding the data the response is built from.
+        :param response: Encoded response.
+        :return: Stored response.
+        """
+        with self._lock:
+            self._entries[key] = (source, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+        return response
+
+    def clear(self) -> None:
+        """
+        Function that removes all responses from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Function that returns cache statistics.
+        :return: Dictionary containing number of hits, misses, invalidations, evictions
+                 and current size of the cache.
+        """
+        with self._lock:
+            return self._counters | {'size': len(self._entries), 'capacity': self.capacity}
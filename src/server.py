@@ -2,152 +2,652 @@
 This module contains definition of class of the HTTP server handler.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler
+import itertools
 import json
-from requests import HTTPError
-from src.csv_converter import convert_json_to_csv
-from src.data_consumer import send_region_request, send_subregion_request
+import logging
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+from requests import RequestException
+from src.admission import AdmissionController, RequestRejectedError
+from src.country import AnnotatedCountry, encode_country
+from src.csv_converter import iter_encoded_csv_lines
+from src.data_consumer import (get_border_graph, get_region_group, get_subregion_group,
+                               get_cache_stats, get_single_flight_stats, get_upstream_stats, is_cached,
+                               list_areas, prefetch, prepare_shared_snapshot, restore_snapshot, UnknownAreaError)
+from src.metrics import (CONTENT_TYPE as _METRICS_CONTENT_TYPE, SERIALIZATION_BUCKETS,
+                         counter, histogram, register_callback, render_metrics)
+from src.precompute import BorderGraph, CountryGroup, UnknownCountryError
+from src.prefork import PreforkSupervisor
+from src.query import CountryQuery, QueryError
+from src.response_cache import EncodedResponse, ResponseCache, negotiate_coding
+from src.serving import PooledHTTPServer
+from src.warm_up import Prefetcher
 
 _MINIMAL_NEIGHBOURS_NUMBER = 3
 _BIGGEST_COUNTRIES_IN_REGION_LIMIT = 10
 _OK_STATUS_CODE = 200
+_NOT_MODIFIED_STATUS_CODE = 304
 _NOK_STATUS_CODE = 400
 _RESOURCE_NOT_FOUND_STATUS_CODE = 404
+_SERVICE_UNAVAILABLE_STATUS_CODE = 503
 _COUNTRY_SIZE_DEF = 'population'  # can be changed to 'area' for example
 _REMOTE_HOST_ERROR_MSG = 'Error retrieving information about contries from remote host'
 _RESOURCE_NOT_FOUND_MSG = 'Endpoint not found!'
 _BAD_HEADER_TYPE_MSG = 'Accept header must contain either "json" or "csv"'
+_AREA_PARAMETER_MSG = 'Exactly one of region and subregion parameters is required'
+_AREA_FORBIDDEN_CHARS = '/?#'  # would change path of request to remote host
+_MAX_HOPS = 10
+_HOPS_PARAMETER_MSG = f'The only supported parameter is hops, an integer from 1 to {_MAX_HOPS}'
+_NEIGHBOURS_POPULATION_FIELD = 'Total neighbours population'
+_NEIGHBOURHOOD_POPULATION_FIELD = 'Total neighbourhood population'
+_HOPS_FIELD = 'Hops'
+_JSON_FORMAT = 'json'
+_CSV_FORMAT = 'csv'
+_NDJSON_FORMAT = 'ndjson'
 _EMPTY_HEADERS = ('/*/', '*/*', '')
+_KEEP_ALIVE_TIMEOUT = 5
+_SERVER_ADDRESS = (os.environ.get('COUNTRIES_API_BIND_ADDRESS', '0.0.0.0'),
+                   int(os.environ.get('COUNTRIES_API_PORT', 80)))
+_CONTENT_TYPES = {_JSON_FORMAT: 'application/json',
+                  _CSV_FORMAT: 'text/csv; charset=utf-8',
+                  _NDJSON_FORMAT: 'application/x-ndjson'}
+_TEXT_CONTENT_TYPE = 'text/plain; charset=utf-8'
+_VARY_HEADERS = 'Accept, Accept-Encoding'
+_RESPONSE_CACHE_CAPACITY = int(os.environ.get('COUNTRIES_API_RESPONSE_CACHE_CAPACITY', 256))
+_MAX_CACHED_ROWS = int(os.environ.get('COUNTRIES_API_MAX_CACHED_ROWS', 100))
+_STREAM_CHUNK_SIZE = 16384
+_PROCESSES_NUMBER = int(os.environ.get('COUNTRIES_API_PROCESSES', 1))
+_ACCESS_LOG_ENABLED = os.environ.get('COUNTRIES_API_ACCESS_LOG', '') == '1'
+_ROUTES = ('/top_ten_countries', '/all_countries_in_subregion', '/population_of_subregion', '/neighbours',
+           '/neighbourhood')
+_COUNTRIES_ROUTE = '/countries'
+_STATS_ROUTES = ('cache', 'upstream')
+_METRICS_ROUTE = '/metrics'
+_READY_ROUTE = '/ready'
+_UNLIMITED_ROUTES = (_METRICS_ROUTE, _READY_ROUTE)
+_OTHER_ROUTE = 'other'
+_METRICS_FORMAT = 'prometheus'
+_UNKNOWN_FORMAT = 'unknown'
+
+_logger = logging.getLogger(__name__)
+_access_logger = logging.getLogger('countries_api.access')
+_response_cache = ResponseCache(capacity=_RESPONSE_CACHE_CAPACITY)
+_prefetcher = Prefetcher(list_keys=list_areas, load=prefetch)
+_admission = AdmissionController()
+_TOP_TEN_QUERY = CountryQuery(sort=_COUNTRY_SIZE_DEF, order='desc', limit=_BIGGEST_COUNTRIES_IN_REGION_LIMIT)
+_MORE_NEIGHBOURS_QUERY = CountryQuery(ranges={'borders': (_MINIMAL_NEIGHBOURS_NUMBER + 1, None)})
+_TOTAL_POPULATION_QUERY = CountryQuery(with_total_population=True)
+_requests_total = counter('countries_api_requests_total', 'Handled requests by route, format and status code.',
+                          ('route', 'format', 'status'))
+_request_latency = histogram('countries_api_request_duration_seconds', 'Time of handling requests.',
+                             ('route', 'format'))
+_serialization_latency = histogram('countries_api_serialization_duration_seconds',
+                                   'Time of converting data of cached responses to requested format.',
+                                   ('format',), buckets=SERIALIZATION_BUCKETS)
+
+
+def _cache_samples(name: str) -> callable:
+    """
+    Function that returns function reading given counter of the data cache and the response cache.
+    :param name: Name of the counter in statistics of both caches.
+    :return: Function returning dictionary mapping cache label to value of the counter.
+    """
+    return lambda: {('data',): get_cache_stats()[name], ('response',): _response_cache.stats()[name]}
+
+def _upstream_samples(name: str) -> callable:
+    """
+    Function that returns function reading given counter of the client of remote host.
+    :param name: Name of the counter in statistics of the client.
+    :return: Function returning dictionary with single value of the counter.
+    """
+    return lambda: {(): get_upstream_stats()[name]}
+
+
+register_callback('countries_api_cache_hits_total', 'Cache hits.', 'counter', ('cache',), _cache_samples('hits'))
+register_callback('countries_api_cache_misses_total', 'Cache misses.', 'counter', ('cache',), _cache_samples('misses'))
+register_callback('countries_api_cache_evictions_total', 'Entries evicted from cache.', 'counter', ('cache',),
+                  _cache_samples('evictions'))
+register_callback('countries_api_cache_entries', 'Entries stored in cache.', 'gauge', ('cache',),
+                  _cache_samples('size'))
+register_callback('countries_api_cache_stale_hits_total', 'Stale entries returned from the data cache.', 'counter',
+                  (), lambda: {(): get_cache_stats()['stale']})
+register_callback('countries_api_upstream_coalesced_calls_total',
+                  'Requests for data that waited for already running retrieval.', 'counter', (),
+                  lambda: {(): get_single_flight_stats()['coalesced']})
+register_callback('countries_api_upstream_requests_total', 'HTTP requests sent to remote host.', 'counter', (),
+                  _upstream_samples('requests'))
+register_callback('countries_api_upstream_retries_total', 'Retried HTTP requests to remote host.', 'counter', (),
+                  _upstream_samples('retries'))
+register_callback('countries_api_upstream_rejected_total', 'Requests rejected by the circuit breaker.', 'counter', (),
+                  _upstream_samples('rejected'))
+register_callback('countries_api_admission_in_flight', 'Requests admitted and being handled.', 'gauge', (),
+                  lambda: {(): _admission.stats()['in_flight']})
+register_callback('countries_api_admission_upstream_in_flight',
+                  'Requests admitted and being handled which need data from remote host.', 'gauge', (),
+                  lambda: {(): _admission.stats()['upstream_in_flight']})
+register_callback('countries_api_admission_waiting', 'Requests waiting for admission.', 'gauge', (),
+                  lambda: {(): _admission.stats()['waiting']})
+register_callback('countries_api_upstream_circuit_open', 'Whether the circuit breaker is open (1) or not (0).',
+                  'gauge', (), lambda: {(): int(get_upstream_stats()['circuit'] == 'open')})
+
 
 class CountriesAPIHandler(BaseHTTPRequestHandler):
     """
     Class representing handler for server for Countries API.
     """
+    protocol_version = 'HTTP/1.1'
+    timeout = _KEEP_ALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+
     def do_GET(self) -> None:
         """
-        Function that handles HTTP GET requests received by the server.
+        Function that handles HTTP GET requests received by the server and records its metrics.
+        Requests other than /metrics and /ready are handled only if they are admitted by admission control.
         """
+        start = time.perf_counter()
         path, param = self._parse_path()
+        route = self._route_label(path=path, param=param)
+        self._status_code = None
+        self._output_format = _UNKNOWN_FORMAT
+        try:
+            if route in _UNLIMITED_ROUTES:
+                self._route_request(path=path, param=param)
+            else:
+                with _admission.admit(client=self.client_address[0], cached=self._is_cached(path=path, param=param)):
+                    self._route_request(path=path, param=param)
+        except RequestRejectedError as error:
+            self._send_response(message=str(error), status_code=error.status_code,
+                                headers={'Retry-After': str(error.retry_after)})
+        finally:
+            self._record_request(route=route, duration=time.perf_counter() - start)
+
+    def _is_cached(self, path: str, param: str) -> bool:
+        """
+        Function that checks if the request can be answered without waiting for remote host,
+        such requests have priority in admission control.
+        :param path: Path of the endpoint.
+        :param param: Parameter of the endpoint.
+        :return: False if data the request needs is not cached, True otherwise.
+        """
+        match path:
+            case '' if param == _COUNTRIES_ROUTE.lstrip('/'):
+                params = parse_qs(urlsplit(self.path).query)
+                areas = [(kind, params[kind][0].lower()) for kind in ('region', 'subregion') if kind in params]
+                return not areas or is_cached(*areas[0])
+            case '/top_ten_countries':
+                return is_cached('region', param)
+            case '/all_countries_in_subregion' | '/population_of_subregion':
+                return is_cached('subregion', param)
+            case '/neighbours' | '/neighbourhood':
+                return is_cached('all', '')
+        return True
+
+    def _route_request(self, path: str, param: str) -> None:
+        """
+        Function that passes request to the handler of the endpoint.
+        :param path: Path of the endpoint.
+        :param param: Parameter of the endpoint.
+        """
+        if (path, param) == ('', _METRICS_ROUTE.lstrip('/')):
+            self._output_format = _METRICS_FORMAT
+            self._metrics()
+            return
+        if (path, param) == ('', _READY_ROUTE.lstrip('/')):
+            self._output_format = _JSON_FORMAT
+            self._readiness()
+            return
+
         try:
-            csv_output = self._set_response_type()
+            output_format = self._output_format = self._set_response_type()
         except ValueError:
             self._send_response(message=_BAD_HEADER_TYPE_MSG, status_code=_NOK_STATUS_CODE)
             return
 
         match path:
+            case '' if param == _COUNTRIES_ROUTE.lstrip('/'):
+                self._query_countries(output_format=output_format)
             case '/top_ten_countries':
-                self._ten_biggest_countries_by_region(region=param, csv_output=csv_output)
+                self._ten_biggest_countries_by_region(region=param, output_format=output_format)
             case '/all_countries_in_subregion':
-                self._all_countries_in_subregion(subregion=param, csv_output=csv_output)
+                self._all_countries_in_subregion(subregion=param, output_format=output_format)
             case '/population_of_subregion':
-                self._population_of_subregion(subregion=param, csv_output=csv_output)
+                self._population_of_subregion(subregion=param, output_format=output_format)
+            case '/neighbours':
+                self._neighbours(code=param, output_format=output_format)
+            case '/neighbourhood':
+                self._neighbourhood(code=param, output_format=output_format)
+            case '/stats' if param == 'cache':
+                self._cache_statistics(output_format=output_format)
+            case '/stats' if param == 'upstream':
+                self._upstream_statistics(output_format=output_format)
             case _:
                 self._send_response(message=_RESOURCE_NOT_FOUND_MSG,
                                     status_code=_RESOURCE_NOT_FOUND_STATUS_CODE)
 
-    def _ten_biggest_countries_by_region(self, region: str = None, csv_output: bool = False) -> None:
+    def _ten_biggest_countries_by_region(self, region: str = None, output_format: str = _JSON_FORMAT) -> None:
         """
-        Function that handles endpoint /top_ten_countries/{region}
+        Function that handles endpoint /top_ten_countries/{region}, alias of
+        /countries?region={region}&sort=population&order=desc&limit=10
         :param region: Region name
         """
-        try:
-            data = send_region_request(region=region)
-        except HTTPError:
-            self._send_response(message=_REMOTE_HOST_ERROR_MSG, status_code=_NOK_STATUS_CODE)
-            return
+        self._send_query_response(kind='region', name=region, query=_TOP_TEN_QUERY, output_format=output_format)
 
-        data = sorted(data, reverse=True,
-                      key=lambda x: x[_COUNTRY_SIZE_DEF])[:_BIGGEST_COUNTRIES_IN_REGION_LIMIT]
+    def _all_countries_in_subregion(self, subregion: str = None, output_format: str = _JSON_FORMAT) -> None:
+        """
+        Function that handles endpoint /all_countries_in_subregion/{region}, alias of
+        /countries?subregion={subregion}&min_borders=4
+        :param subregion: Subregion name
+        """
+        self._send_query_response(kind='subregion', name=subregion, query=_MORE_NEIGHBOURS_QUERY,
+                                  output_format=output_format)
+
+    def _population_of_subregion(self, subregion: str = None, output_format: str = _JSON_FORMAT) -> None:
+        """
+        Function that handles endpoint /population_of_subregion/{subregion}, alias of
+        /countries?subregion={subregion}&with_total_population=true
+        :param subregion: Subregion name
+        """
+        self._send_query_response(kind='subregion', name=subregion, query=_TOTAL_POPULATION_QUERY,
+                                  output_format=output_format)
+
+    def _query_countries(self, output_format: str = _JSON_FORMAT) -> None:
+        """
+        Function that handles endpoint /countries?region={region}|subregion={subregion}&sort=...
+        with parameters described in CountryQuery.from_params, region or subregion name must not
+        contain '/', '?' or '#' characters
+        """
+        params = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+        areas = [(kind, params.pop(kind)) for kind in ('region', 'subregion') if kind in params]
+        if len(areas) != 1 or len(areas[0][1]) != 1 or any(char in areas[0][1][0] for char in _AREA_FORBIDDEN_CHARS):
+            self._send_response(message=_AREA_PARAMETER_MSG, status_code=_NOK_STATUS_CODE)
+            return
 
-        data = self._convert_data_to_requested_type(data=data, csv_output=csv_output)
+        try:
+            query = CountryQuery.from_params(params)
+        except QueryError as error:
+            self._send_response(message=str(error), status_code=_NOK_STATUS_CODE)
+            return
 
-        self._send_response(message=data, status_code=_OK_STATUS_CODE)
+        kind, (name,) = areas[0]
+        self._send_query_response(kind=kind, name=name.lower(), query=query, output_format=output_format)
 
-    def _all_countries_in_subregion(self, subregion: str = None, csv_output: bool = False) -> None:
+    def _send_query_response(self, kind: str, name: str, query: CountryQuery, output_format: str) -> None:
         """
-        Function that handles endpoint /all_countries_in_subregion/{region}
-        :param subregion: Subregion name
+        Function that sends countries of region or subregion matching the query. Responses of
+        equal queries are shared by /countries endpoint and its aliases.
+        :param kind: Either 'region' or 'subregion'.
+        :param name: Region or subregion name.
+        :param query: Query to be answered.
+        :param output_format: Requested format, i.e. 'json', 'csv' or 'ndjson'.
         """
         try:
-            data = send_subregion_request(subregion=subregion)
-        except HTTPError:
+            group = get_region_group(region=name) if kind == 'region' else get_subregion_group(subregion=name)
+        except (RequestException, UnknownAreaError):
             self._send_response(message=_REMOTE_HOST_ERROR_MSG, status_code=_NOK_STATUS_CODE)
             return
 
-        data = [country for country in data if len(country['borders']) > _MINIMAL_NEIGHBOURS_NUMBER]
+        self._send_cached_response(key=(kind, name, query.key, output_format), group=group,
+                                   output_format=output_format, build=lambda: group.query(query))
 
-        data = self._convert_data_to_requested_type(data=data, csv_output=csv_output)
+    def _neighbours(self, code: str, output_format: str = _JSON_FORMAT) -> None:
+        """
+        Function that handles endpoint /neighbours/{code}, it responds with countries bordering
+        with the country of given three-letter code and attaches their total population.
+        :param code: Three-letter code of the country (cca3).
+        """
+        def build() -> list:
+            countries, total = graph.neighbours(code)
+            return [AnnotatedCountry(country, {_NEIGHBOURS_POPULATION_FIELD: total}) for country in countries]
 
-        self._send_response(message=data, status_code=_OK_STATUS_CODE)
+        graph = self._border_graph(code=code)
+        if graph is not None:
+            self._send_cached_response(key=('neighbours', code.upper(), None, output_format), group=graph,
+                                       output_format=output_format, build=build)
 
-    def _population_of_subregion(self, subregion: str = None, csv_output: bool = False) -> None:
+    def _neighbourhood(self, code: str, output_format: str = _JSON_FORMAT) -> None:
         """
-        Function that handles endpoint /population_of_subregion/{subregion}
-        :param subregion: Subregion name
+        Function that handles endpoint /neighbourhood/{code}?hops={hops}, it responds with countries
+        reachable from the country of given three-letter code by crossing at most hops borders (1 by
+        default), with number of crossed borders and total population of the countries attached.
+        :param code: Three-letter code of the country (cca3).
+        """
+        params = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+        hops = params.pop('hops', ['1'])
+        if params or len(hops) != 1 or not hops[0].isdigit() or not 1 <= int(hops[0]) <= _MAX_HOPS:
+            self._send_response(message=_HOPS_PARAMETER_MSG, status_code=_NOK_STATUS_CODE)
+            return
+        hops = int(hops[0])
+
+        def build() -> list:
+            reached, total = graph.neighbourhood(code, hops)
+            return [AnnotatedCountry(country, {_HOPS_FIELD: distance, _NEIGHBOURHOOD_POPULATION_FIELD: total})
+                    for country, distance in reached]
+
+        graph = self._border_graph(code=code)
+        if graph is not None:
+            self._send_cached_response(key=('neighbourhood', code.upper(), hops, output_format), group=graph,
+                                       output_format=output_format, build=build)
+
+    def _border_graph(self, code: str) -> BorderGraph | None:
+        """
+        Function that returns graph of borders containing the country. If the graph cannot
+        be retrieved or the country is unknown, it sends response with 400 status code.
+        :param code: Three-letter code of the country (cca3).
+        :return: Graph of borders or None if error response was sent.
         """
         try:
-            data = send_subregion_request(subregion=subregion)
-        except HTTPError:
+            graph = get_border_graph()
+            graph.position(code)
+        except RequestException:
             self._send_response(message=_REMOTE_HOST_ERROR_MSG, status_code=_NOK_STATUS_CODE)
-            return
+            return None
+        except UnknownCountryError as error:
+            self._send_response(message=str(error), status_code=_NOK_STATUS_CODE)
+            return None
+        return graph
 
-        subregion_population = sum([country['population'] for country in data])
-        data = [country | {'Total subregion population': subregion_population} for country in data]
+    def _cache_statistics(self, output_format: str = _JSON_FORMAT) -> None:
+        """
+        Function that handles endpoint /stats/cache
+        """
+        single_flight_stats = get_single_flight_stats()
+        response_cache_stats = {f'response_{name}': value for name, value in _response_cache.stats().items()}
+        data = get_cache_stats() | {'upstream_calls': single_flight_stats['calls'],
+                                    'coalesced_calls': single_flight_stats['coalesced']} | response_cache_stats
 
-        data = self._convert_data_to_requested_type(data=data, csv_output=csv_output)
+        data = self._convert_data_to_requested_type(data=data, output_format=output_format)
 
-        self._send_response(message=data, status_code=_OK_STATUS_CODE)
+        self._send_response(message=data, status_code=_OK_STATUS_CODE,
+                            content_type=self._content_type(output_format=output_format))
+
+    def _metrics(self) -> None:
+        """
+        Function that handles endpoint /metrics
+        """
+        self._send_response(message=render_metrics(), status_code=_OK_STATUS_CODE,
+                            content_type=_METRICS_CONTENT_TYPE)
+
+    def _readiness(self) -> None:
+        """
+        Function that handles endpoint /ready, it responds with 503 status code
+        until the warm-up has finished if readiness waits for it.
+        """
+        status = _prefetcher.status()
+        self._send_response(message=json.dumps(status),
+                            status_code=_OK_STATUS_CODE if status['ready'] else _SERVICE_UNAVAILABLE_STATUS_CODE,
+                            content_type=self._content_type(output_format=_JSON_FORMAT))
+
+    def _route_label(self, path: str, param: str) -> str:
+        """
+        Function that returns route of the request used as label of metrics. Parameters
+        of data endpoints and unknown paths are not included, so number of labels is bounded.
+        :param path: Path of the endpoint.
+        :param param: Parameter of the endpoint.
+        :return: Route of the request.
+        """
+        if path in _ROUTES:
+            return path
+        if (path, param) == ('', _COUNTRIES_ROUTE.lstrip('/')):
+            return _COUNTRIES_ROUTE
+        if path == '/stats' and param in _STATS_ROUTES:
+            return f'{path}/{param}'
+        if (path, param) == ('', _METRICS_ROUTE.lstrip('/')):
+            return _METRICS_ROUTE
+        if (path, param) == ('', _READY_ROUTE.lstrip('/')):
+            return _READY_ROUTE
+        return _OTHER_ROUTE
+
+    def _record_request(self, route: str, duration: float) -> None:
+        """
+        Function that records metrics of handled request and writes access log entry if enabled.
+        :param route: Route of the request.
+        :param duration: Time of handling the request in seconds.
+        """
+        status = str(self._status_code)
+        _requests_total.inc(route, self._output_format, status)
+        _request_latency.observe(duration, route, self._output_format)
+        if _ACCESS_LOG_ENABLED:
+            _access_logger.info(json.dumps({
+                'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                'client': self.client_address[0], 'method': self.command, 'path': self.path,
+                'route': route, 'format': self._output_format, 'status': self._status_code,
+                'duration_ms': round(duration * 1000, 3), 'user_agent': self.headers.get('User-Agent')}))
+
+    def log_request(self, code: int | str = '-', size: int | str = '-') -> None:
+        """
+        Function called with status code of every response. It stores the code for metrics
+        and access log instead of writing line to stderr.
+        :param code: Status code of the response.
+        :param size: Size of the response, unused.
+        """
+        self._status_code = int(code) if str(code).isdigit() else code
+
+    def log_error(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        """
+        Function that logs errors of processing requests (e.g. malformed requests or timeouts) with logging module.
+        """
+        _logger.warning('%s - %s', self.address_string(), format % args)
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        """
+        Function that logs messages of the handler with logging module instead of stderr.
+        """
+        _logger.info('%s - %s', self.address_string(), format % args)
 
     def _parse_path(self) -> tuple[str, str]:
         """
-        Function that parses path from request and retrieves parameter value.
+        Function that parses path from request, without query string, and retrieves parameter value.
         :return: Tuple containing path and parameter.
         """
-        param = self.path.rstrip('/').split('/')[-1].replace('%20', ' ').lower()
-        path = '/'.join(self.path.rstrip('/').split('/')[:-1])
+        request_path = urlsplit(self.path).path.rstrip('/')
+        param = request_path.split('/')[-1].replace('%20', ' ').lower()
+        path = '/'.join(request_path.split('/')[:-1])
         return path, param
 
-    def _set_response_type(self) -> bool:
+    def _set_response_type(self) -> str:
         """
         Function that checks what type of response should be sent.
-        If JSON is requested, it returns False, if CSV is requested, it returns True.
-        If both JSON and CSV are requested, JSON is selected.
+        If NDJSON is requested, it returns 'ndjson', if JSON is requested, it returns 'json',
+        if CSV is requested, it returns 'csv'. If both JSON and CSV are requested, JSON is selected.
         If no header is present, JSON is selected.
-        :return: True if only CSV is requested, False otherwise.
+        :return: Requested format, i.e. 'json', 'csv' or 'ndjson'.
         """
-        header_accept_info = self.headers.get('Accept').lower()
+        header_accept_info = self.headers.get('Accept', '').lower()
+
+        if 'ndjson' in header_accept_info:
+            return _NDJSON_FORMAT
 
         if 'json' in header_accept_info or header_accept_info in _EMPTY_HEADERS:
-            return False
+            return _JSON_FORMAT
 
         if 'csv' in header_accept_info:
-            return True
+            return _CSV_FORMAT
 
         raise ValueError('Accept header must contain either "json" or "csv"')
 
-    def _convert_data_to_requested_type(self, data: dict | list, csv_output: bool) -> str | list:
+    def _convert_data_to_requested_type(self, data: dict | list, output_format: str) -> str:
         """
         Function that converts data to requested type.
         :param data: Data to be converted.
-        :param csv_output: Flag indicating if only CSV output is requested.
+        :param output_format: Requested format, i.e. 'json', 'csv' or 'ndjson'.
         :return: Converted data.
         """
-        if csv_output:
-            return convert_json_to_csv(data=data)
+        return b''.join(self._iter_encoded_data(data=data, output_format=output_format)).decode()
+
+    def _iter_encoded_data(self, data: dict | list, output_format: str) -> Iterator[bytes]:
+        """
+        Generator that converts data to requested type and encodes it piece by piece. JSON list
+        is converted one element at a time, so joined pieces are identical to the output of json.dumps.
+        Country records are not converted again, their JSON objects and CSV lines encoded when
+        the records were created are used instead.
+        :param data: Data to be converted.
+        :param output_format: Requested format, i.e. 'json', 'csv' or 'ndjson'.
+        :return: Iterator of pieces of encoded data.
+        """
+        if output_format == _CSV_FORMAT:
+            yield from iter_encoded_csv_lines(data)
+            return
+
+        if isinstance(data, dict):
+            yield json.dumps(data, default=encode_country).encode()
+            return
+
+        separator = b'\n' if output_format == _NDJSON_FORMAT else b', '
+        if output_format == _JSON_FORMAT:
+            yield b'['
+        for index, item in enumerate(data):
+            if index:
+                yield separator
+            encoded = getattr(item, 'encoded_json', None)
+            yield encoded if encoded is not None else json.dumps(item, default=encode_country).encode()
+        if output_format == _JSON_FORMAT:
+            yield b']'
+
+    def _upstream_statistics(self, output_format: str = _JSON_FORMAT) -> None:
+        """
+        Function that handles endpoint /stats/upstream
+        """
+        data = self._convert_data_to_requested_type(data=get_upstream_stats(), output_format=output_format)
+
+        self._send_response(message=data, status_code=_OK_STATUS_CODE,
+                            content_type=self._content_type(output_format=output_format))
+
+    def _send_cached_response(self, key: tuple, group: CountryGroup | BorderGraph, build: callable,
+                              output_format: str) -> None:
+        """
+        Function that sends response built from group of countries. Encoded response is cached
+        until the data of the group changes. Responses with more than _MAX_CACHED_ROWS rows
+        are not cached, they are streamed to the client instead.
+        :param key: Tuple of endpoint, parameter and format identifying the response.
+        :param group: Group of countries or graph of borders the response is built from.
+        :param build: Function without arguments returning data to be sent.
+        :param output_format: Requested format, i.e. 'json', 'csv' or 'ndjson'.
+        """
+        response = _response_cache.lookup(key=key, source=group)
+        if response is None:
+            data = build()
+            if len(data) > _MAX_CACHED_ROWS:
+                self._stream_response(data=data, output_format=output_format)
+                return
+
+            start = time.perf_counter()
+            body = b''.join(self._iter_encoded_data(data=data, output_format=output_format)) + b'\n'
+            _serialization_latency.observe(time.perf_counter() - start, output_format)
+            response = _response_cache.store(key=key, source=group, response=EncodedResponse(
+                body=body, expires_at=group.expires_at, content_type=_CONTENT_TYPES[output_format]))
+
+        self._send_encoded_response(response=response)
+
+    def _stream_response(self, data: list, output_format: str) -> None:
+        """
+        Function that sends data converted to requested type while it is being converted,
+        using chunked transfer encoding, so the whole body is never kept in memory.
+        HTTP/1.0 clients receive the body without chunks and the connection is closed afterwards.
+        :param data: Data to be sent.
+        :param output_format: Requested format, i.e. 'json', 'csv' or 'ndjson'.
+        """
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(_OK_STATUS_CODE)
+        self.send_header('Content-Type', _CONTENT_TYPES[output_format])
+        self.send_header('Vary', _VARY_HEADERS)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
 
-        return json.dumps(data)
+        pieces = []
+        size = 0
+        for piece in itertools.chain(self._iter_encoded_data(data=data, output_format=output_format), [b'\n']):
+            pieces.append(piece)
+            size += len(piece)
+            if size >= _STREAM_CHUNK_SIZE:
+                self._write_chunk(chunk=b''.join(pieces), chunked=chunked)
+                pieces.clear()
+                size = 0
+        if pieces:
+            self._write_chunk(chunk=b''.join(pieces), chunked=chunked)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, chunk: bytes, chunked: bool) -> None:
+        """
+        Function that writes part of the body to client.
+        :param chunk: Part of the body.
+        :param chunked: Flag indicating if chunked transfer encoding is used.
+        """
+        if chunked:
+            self.wfile.write(f'{len(chunk):X}\r\n'.encode() + chunk + b'\r\n')
+        else:
+            self.wfile.write(chunk)
+
+    def _send_encoded_response(self, response: EncodedResponse) -> None:
+        """
+        Function that sends encoded response with validator and caching headers. The body is sent
+        compressed if the client accepts it. If the client already has the response, it is
+        answered with 304 status code without body.
+        :param response: Encoded response to be sent.
+        """
+        coding = negotiate_coding(self.headers.get('Accept-Encoding'), response.codings())
+        body, etag = response.representation(coding)
+        not_modified = response.matches(self.headers.get('If-None-Match'), coding=coding)
+
+        self.send_response(_NOT_MODIFIED_STATUS_CODE if not_modified else _OK_STATUS_CODE)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f'max-age={response.max_age()}')
+        self.send_header('Vary', _VARY_HEADERS)
+        if not_modified:
+            self.end_headers()
+            return
+
+        self.send_header('Content-Type', response.content_type)
+        if coding != 'identity':
+            self.send_header('Content-Encoding', coding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _content_type(self, output_format: str) -> str:
+        """
+        Function that returns value of Content-Type header for requested type.
+        :param output_format: Requested format, i.e. 'json', 'csv' or 'ndjson'.
+        :return: Content type of requested data.
+        """
+        return _CONTENT_TYPES[output_format]
 
-    def _send_response(self, message: str, status_code: int) -> None:
+    def _send_response(self, message: str, status_code: int, content_type: str = _TEXT_CONTENT_TYPE,
+                       headers: dict | None = None) -> None:
         """
         Function that sends response to client.
         :param message: Message to be sent.
         :param status_code: Status code of the response.
+        :param content_type: Content type of the message.
+        :param headers: Additional headers of the response.
         """
+        body = f'{message}\n'.encode()
         self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(f'{message}\n'.encode())
+        self.wfile.write(body)
 
 
 if __name__ == "__main__":
-    httpd = HTTPServer(('0.0.0.0', 80), CountriesAPIHandler)
-    httpd.serve_forever()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if _PROCESSES_NUMBER > 1:
+        # data is prepared by the supervisor before workers start, so workers are ready immediately
+        _prefetcher = Prefetcher(list_keys=list_areas, load=prefetch, mode='off')
+        PreforkSupervisor(_SERVER_ADDRESS, CountriesAPIHandler, processes=_PROCESSES_NUMBER,
+                          prepare=prepare_shared_snapshot).serve_forever()
+    else:
+        restore_snapshot()
+        _prefetcher.start()
+        httpd = PooledHTTPServer(_SERVER_ADDRESS, CountriesAPIHandler)
+        httpd.serve_forever()
@@ -0,0 +1,218 @@
+"""
+This module contains definition of the concurrent HTTP server used to serve Countries API.
+"""
+import os
+import queue
+import select
+import selectors
+import socket
+import threading
+import time
+from http.server import HTTPServer
+
+_WORKERS_NUMBER = int(os.environ.get('COUNTRIES_API_WORKERS', 16))
+_ACCEPT_QUEUE_SIZE = int(os.environ.get('COUNTRIES_API_ACCEPT_QUEUE', 64))
+_IDLE_CHECK_INTERVAL = 0.5
+_LINGER_TIME = 0.005  # seconds worker waits for next request of the connection
+_QUEUE_FULL_RESPONSE = (b'HTTP/1.1 503 Service Unavailable\r\n'
+                        b'Content-Length: 0\r\n'
+                        b'Retry-After: 1\r\n'
+                        b'Connection: close\r\n\r\n')
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    Class representing HTTP server that hands connections with a request ready to be read to a fixed
+    pool of worker threads through a bounded queue. Between requests idle keep-alive connections are
+    watched by a single poller thread instead of holding a worker, and they are closed after timeout
+    of the handler class. Connections arriving while the queue is full are refused with 503 status
+    code instead of waiting indefinitely.
+    """
+    def __init__(self, server_address: tuple[str, int], handler_class: type,
+                 workers: int = _WORKERS_NUMBER, queue_size: int = _ACCEPT_QUEUE_SIZE,
+                 bind_and_activate: bool = True) -> None:
+        """
+        :param server_address: Tuple containing address and port the server listens on.
+        :param handler_class: Class handling the requests, subclass of BaseHTTPRequestHandler.
+        :param workers: Number of worker threads processing requests.
+        :param queue_size: Maximal number of connections with a request waiting for a worker.
+        :param bind_and_activate: Flag indicating if the socket should be bound and listening,
+                                  False when already listening socket is assigned afterwards.
+        """
+        self.request_queue_size = queue_size
+        self._connections = queue.Queue(maxsize=queue_size)
+        self._parked = queue.SimpleQueue()
+        self._selector = selectors.DefaultSelector()
+        self._wake_up_reader, self._wake_up_writer = socket.socketpair()
+        self._wake_up_writer.setblocking(False)
+        self._selector.register(self._wake_up_reader, selectors.EVENT_READ)
+        self._closing = False
+        self._workers = [threading.Thread(target=self._process_connections, daemon=True)
+                         for _ in range(workers)]
+        self._poller = threading.Thread(target=self._poll_idle_connections, daemon=True)
+        super().__init__(server_address, handler_class, bind_and_activate=bind_and_activate)
+
+        for worker in self._workers:
+            worker.start()
+        self._poller.start()
+
+    def process_request(self, request, client_address) -> None:
+        """
+        Function that enqueues accepted connection for processing by worker threads.
+        :param request: Accepted socket.
+        :param client_address: Address of the client.
+        """
+        self._dispatch(self._open_connection(request, client_address))
+
+    def server_close(self) -> None:
+        """
+        Function that closes listening socket, stops worker threads and the poller
+        and closes idle connections.
+        """
+        super().server_close()
+        self._closing = True
+        self._wake_up()
+        self._poller.join()
+        for _ in self._workers:
+            self._connections.put(None)
+        for worker in self._workers:
+            worker.join()
+
+        for key in list(self._selector.get_map().values()):
+            if key.data is not None:
+                self._close_connection(key.data[0])
+        while not self._parked.empty():
+            self._close_connection(self._parked.get_nowait())
+        while not self._connections.empty():
+            if (handler := self._connections.get_nowait()) is not None:
+                self._close_connection(handler)
+        self._selector.close()
+        self._wake_up_reader.close()
+        self._wake_up_writer.close()
+
+    def _open_connection(self, request, client_address):
+        """
+        Function that prepares handler of accepted connection without handling any request,
+        requests are handled one by one with handle_one_request when they are ready to be read.
+        :param request: Accepted socket.
+        :param client_address: Address of the client.
+        :return: Handler of the connection.
+        """
+        handler = self.RequestHandlerClass.__new__(self.RequestHandlerClass)
+        handler.request, handler.client_address, handler.server = request, client_address, self
+        handler.setup()
+        return handler
+
+    def _dispatch(self, handler) -> None:
+        """
+        Function that enqueues connection with a request ready to be read for processing by worker threads.
+        :param handler: Handler of the connection.
+        """
+        try:
+            self._connections.put_nowait(handler)
+        except queue.Full:
+            self._refuse_request(handler)
+
+    def _process_connections(self) -> None:
+        """
+        Function executed by worker threads, it handles requests of enqueued connections until
+        the server is closed. Requests already received are handled immediately, afterwards
+        connection which is kept alive is passed to the poller.
+        """
+        while (handler := self._connections.get()) is not None:
+            try:
+                while True:
+                    handler.close_connection = True
+                    handler.handle_one_request()
+                    if handler.close_connection or not self._has_pending_request(handler):
+                        break
+            except Exception:  # pylint: disable=broad-except
+                self.handle_error(handler.request, handler.client_address)
+                handler.close_connection = True
+
+            if handler.close_connection:
+                self._close_connection(handler)
+            else:
+                self._parked.put(handler)
+                self._wake_up()
+
+    def _poll_idle_connections(self) -> None:
+        """
+        Function executed by the poller thread, it watches idle keep-alive connections, hands them
+        to worker threads when next request arrives and closes those idle longer than timeout
+        of the handler class.
+        """
+        idle_timeout = self.RequestHandlerClass.timeout
+        next_check = time.monotonic() + _IDLE_CHECK_INTERVAL
+        while not self._closing:
+            while not self._parked.empty():
+                handler = self._parked.get_nowait()
+                self._selector.register(handler.request, selectors.EVENT_READ, (handler, time.monotonic()))
+
+            for key, _ in self._selector.select(timeout=_IDLE_CHECK_INTERVAL):
+                if key.data is None:
+                    self._wake_up_reader.recv(4096)
+                else:
+                    self._selector.unregister(key.fileobj)
+                    self._dispatch(key.data[0])
+
+            now = time.monotonic()
+            if idle_timeout is not None and now >= next_check:
+                next_check = now + _IDLE_CHECK_INTERVAL
+                for key in list(self._selector.get_map().values()):
+                    if key.data is not None and now - key.data[1] > idle_timeout:
+                        self._selector.unregister(key.fileobj)
+                        self._close_connection(key.data[0])
+
+    def _has_pending_request(self, handler) -> bool:
+        """
+        Function that checks if next request of the connection was already received. While no other
+        connection waits for a worker, it also waits for the next request for a short time, so requests
+        sent one after another by busy client do not have to pass through the poller.
+        :param handler: Handler of the connection.
+        :return: True if there is data to be read, False otherwise (also when the connection was closed).
+        """
+        try:
+            handler.connection.settimeout(0)
+            if handler.rfile.peek(1):
+                return True
+            if not self._connections.empty():
+                return False
+            poll = select.poll()
+            poll.register(handler.connection, select.POLLIN)
+            return bool(poll.poll(_LINGER_TIME * 1000))
+        except OSError:
+            return False
+        finally:
+            handler.connection.settimeout(handler.timeout)
+
+    def _wake_up(self) -> None:
+        """
+        Function that interrupts waiting of the poller, so it registers parked connections.
+        """
+        try:
+            self._wake_up_writer.send(b'\0')
+        except OSError:
+            pass
+
+    def _close_connection(self, handler) -> None:
+        """
+        Function that flushes and closes the connection.
+        :param handler: Handler of the connection.
+        """
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(handler.request)
+
+    def _refuse_request(self, handler) -> None:
+        """
+        Function that responds with 503 status code and closes the connection.
+        :param handler: Handler of the connection.
+        """
+        try:
+            handler.request.sendall(_QUEUE_FULL_RESPONSE)
+        except OSError:
+            pass
+        self._close_connection(handler)
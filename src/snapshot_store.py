@@ -0,0 +1,81 @@
+"""
+This module contains functions to persist snapshot of countries data in a local file and load it back.
+
+File consists of fixed size header followed by zlib compressed JSON payload. The header contains
+magic bytes, format version, time at which the data was retrieved from remote host, length
+of the payload and its CRC32 checksum, which allows to detect truncated or corrupted files.
+"""
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+_MAGIC = b'CNTRSNAP'
+_FORMAT_VERSION = 2
+_HEADER = struct.Struct('<8sHdII')
+_COMPRESSION_LEVEL = 6
+
+
+class SnapshotFileError(Exception):
+    """
+    Exception raised when snapshot file is missing, corrupted or written in unsupported version.
+    """
+
+
+def save_snapshot(path: str, countries: list, fetched_at: float | None = None) -> None:
+    """
+    Function that writes countries data to the snapshot file. The file is replaced atomically,
+    so readers never see partially written file.
+    :param path: Path of the snapshot file.
+    :param countries: Sanitized data about countries.
+    :param fetched_at: Unix time at which the data was retrieved, now by default.
+    """
+    payload = zlib.compress(json.dumps(countries, separators=(',', ':')).encode(), _COMPRESSION_LEVEL)
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, time.time() if fetched_at is None else fetched_at,
+                          len(payload), zlib.crc32(payload))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(header + payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+def load_snapshot(path: str) -> tuple[list, float]:
+    """
+    Function that reads countries data from the snapshot file and verifies its integrity.
+    :param path: Path of the snapshot file.
+    :return: Tuple containing sanitized data about countries and Unix time at which it was retrieved.
+    """
+    try:
+        with open(path, 'rb') as file:
+            content = file.read()
+    except OSError as error:
+        raise SnapshotFileError(f'Cannot read snapshot file {path}: {error}') from error
+
+    if len(content) < _HEADER.size:
+        raise SnapshotFileError(f'Snapshot file {path} is truncated')
+
+    magic, version, fetched_at, length, checksum = _HEADER.unpack_from(content)
+    payload = content[_HEADER.size:]
+    if magic != _MAGIC:
+        raise SnapshotFileError(f'File {path} is not a snapshot file')
+    if version != _FORMAT_VERSION:
+        raise SnapshotFileError(f'Unsupported snapshot file version {version}')
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise SnapshotFileError(f'Snapshot file {path} is corrupted')
+
+    try:
+        countries = json.loads(zlib.decompress(payload))
+    except (zlib.error, ValueError) as error:
+        raise SnapshotFileError(f'Snapshot file {path} is corrupted') from error
+
+    return countries, fetched_at
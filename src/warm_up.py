@@ -0,0 +1,133 @@
+"""
+This module contains definition of prefetcher loading data about all regions and subregions ahead of requests.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+
+_WARM_UP_MODE = os.environ.get('COUNTRIES_API_WARM_UP', 'off')  # 'off', 'background' or 'blocking'
+_WARM_UP_WORKERS = int(os.environ.get('COUNTRIES_API_WARM_UP_WORKERS', 8))
+_PREFETCH_INTERVAL = float(os.environ.get('COUNTRIES_API_PREFETCH_INTERVAL', 3000))
+_RETRY_DELAY = 30
+
+_logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Class that loads data about all regions and subregions concurrently with a bounded pool
+    of threads when the server starts (warm-up) and loads it again periodically, before cached
+    data expires. In 'blocking' mode the server is reported as ready only after the warm-up
+    has finished, in 'background' mode it is ready immediately.
+    """
+    def __init__(self, list_keys: callable, load: callable, mode: str = _WARM_UP_MODE,
+                 workers: int = _WARM_UP_WORKERS, interval: float = _PREFETCH_INTERVAL) -> None:
+        """
+        :param list_keys: Function without arguments returning list of keys to be loaded.
+        :param load: Function loading data for single key and storing it in the cache.
+        :param mode: Either 'off', 'background' or 'blocking'.
+        :param workers: Maximal number of keys loaded at the same time.
+        :param interval: Time in seconds between loads, 0 disables periodic loads after the warm-up.
+        """
+        if mode not in ('off', 'background', 'blocking'):
+            raise ValueError(f'Unsupported warm-up mode: {mode}')
+        self.list_keys = list_keys
+        self.load = load
+        self.mode = mode
+        self.workers = workers
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._warmed_up = threading.Event()
+        self._thread = None
+        self._status = {'runs': 0, 'loaded': 0, 'failed': 0, 'last_run_at': None, 'last_run_duration': None}
+
+    def start(self) -> None:
+        """
+        Function that starts warm-up and periodic loads in background thread, unless mode is 'off'.
+        """
+        if self.mode == 'off' or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Function that stops periodic loads and waits for the background thread.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self) -> bool:
+        """
+        Function that loads all keys concurrently and waits until all of them are loaded.
+        :return: True if all keys were loaded, False if listing or loading any of them failed.
+        """
+        start = time.monotonic()
+        try:
+            keys = self.list_keys()
+        except Exception as error:  # pylint: disable=broad-except
+            _logger.warning('Listing regions and subregions to prefetch failed: %s', error)
+            loaded, failed = 0, 1
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prefetch') as pool:
+                results = list(pool.map(self._load_key, keys))
+            loaded, failed = results.count(True), results.count(False)
+
+        with self._lock:
+            self._status['runs'] += 1
+            self._status['loaded'] = loaded
+            self._status['failed'] = failed
+            self._status['last_run_at'] = time.time()
+            self._status['last_run_duration'] = round(time.monotonic() - start, 3)
+        return failed == 0
+
+    def ready(self) -> bool:
+        """
+        Function that checks if the server can receive traffic.
+        :return: False in 'blocking' mode until the warm-up has finished, True otherwise.
+        """
+        return self.mode != 'blocking' or self._warmed_up.is_set()
+
+    def status(self) -> dict:
+        """
+        Function that returns state of prefetching.
+        :return: Dictionary containing readiness, mode, number of finished runs, number of keys
+                 loaded and failed in the last run, its time and duration in seconds.
+        """
+        with self._lock:
+            return {'ready': self.ready(), 'mode': self.mode} | self._status
+
+    def _run(self) -> None:
+        """
+        Function executed by background thread, it performs the warm-up and then loads all keys
+        again every interval. Failed loads are retried after _RETRY_DELAY seconds, unless the
+        interval is shorter. The warm-up is finished after the first run even if it failed,
+        as requests can still be answered by retrieving data when it is needed.
+        """
+        succeeded = self.run_once()
+        self._warmed_up.set()
+        while True:
+            if succeeded:
+                delay = self.interval
+            else:
+                delay = min(_RETRY_DELAY, self.interval) if self.interval > 0 else _RETRY_DELAY
+            if delay <= 0 or self._stopped.wait(delay):
+                return
+            succeeded = self.run_once()
+
+    def _load_key(self, key: object) -> bool:
+        """
+        Function that loads single key.
+        :param key: Key to be loaded.
+        :return: True if the key was loaded, False otherwise.
+        """
+        try:
+            self.load(*key)
+        except Exception as error:  # pylint: disable=broad-except
+            _logger.warning('Prefetching %s failed: %s', key, error)
+            return False
+        return True
@@ -0,0 +1,151 @@
+"""
+This module contains integration tests for supervisor of pre-forked server processes.
+"""
+from http.client import HTTPConnection
+import os
+import signal
+import subprocess
+import sys
+import socket
+import textwrap
+import time
+import pytest
+
+_SERVER_LOCAL_IP_ADDR = '127.0.0.8'
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_TIMEOUT = 10
+_SUPERVISOR_SCRIPT = textwrap.dedent('''
+    import os, sys
+    from http.server import BaseHTTPRequestHandler
+    from src.metrics import counter, render_metrics
+    from src.prefork import PreforkSupervisor
+
+    shared = {}
+    requests_total = counter('test_requests_total', 'Answered requests.')
+
+    def prepare():
+        shared['generation'] = shared.get('generation', 0) + 1
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = render_metrics().encode()
+            else:
+                requests_total.inc()
+                body = f"{os.getpid()} {shared['generation']}".encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    PreforkSupervisor((sys.argv[1], int(sys.argv[2])), Handler, processes=2, prepare=prepare,
+                      reload_interval=None, workers=2).serve_forever()
+''')
+
+
+@pytest.fixture(name='supervisor')
+def fixture_supervisor():
+    """
+    Fixture that starts supervisor with two worker processes in separate process.
+    """
+    with socket.socket() as probe:
+        probe.bind((_SERVER_LOCAL_IP_ADDR, 0))
+        address = probe.getsockname()
+    process = subprocess.Popen([sys.executable, '-c', _SUPERVISOR_SCRIPT, *map(str, address)],
+                               cwd=_ROOT_PATH, env=os.environ | {'PYTHONPATH': _ROOT_PATH})
+    _wait_for(lambda: _get(address))
+
+    yield process, address
+
+    if process.poll() is None:
+        process.terminate()
+        process.wait(timeout=_TIMEOUT)
+
+def _get(address: tuple) -> tuple[int, int] | None:
+    """
+    Function that sends GET request on new connection and returns process ID and data generation
+    of the worker which answered it, None if the request failed.
+    """
+    try:
+        connection = HTTPConnection(*address, timeout=1)
+        connection.request('GET', '/')
+        pid, generation = connection.getresponse().read().split()
+        connection.close()
+        return int(pid), int(generation)
+    except OSError:
+        return None
+
+def _wait_for(condition: callable) -> object:
+    """
+    Function that waits until condition returns true value and returns it.
+    """
+    deadline = time.monotonic() + _TIMEOUT
+    while time.monotonic() < deadline:
+        if result := condition():
+            return result
+        time.sleep(0.05)
+    raise AssertionError('Condition not met in time')
+
+def _worker_pids(address: tuple) -> set:
+    """
+    Function that sends many requests and returns process IDs of workers which answered them.
+    """
+    return {response[0] for response in (_get(address) for _ in range(50)) if response}
+
+def test_crashed_worker_is_replaced(supervisor) -> None:
+    """
+    Test checks if worker killed with SIGKILL is replaced by new one.
+    """
+    process, address = supervisor
+    killed_pid = _get(address)[0]
+    assert killed_pid != process.pid
+
+    os.kill(killed_pid, signal.SIGKILL)
+
+    _wait_for(lambda: len(_worker_pids(address) - {killed_pid}) == 2)
+    assert killed_pid not in _worker_pids(address)
+
+def test_sighup_restarts_workers_with_reloaded_data(supervisor) -> None:
+    """
+    Test checks if SIGHUP makes supervisor prepare data again and replace all workers.
+    """
+    process, address = supervisor
+    assert _get(address)[1] == 1
+
+    process.send_signal(signal.SIGHUP)
+
+    _wait_for(lambda: all((_get(address) or (0, 0))[1] == 2 for _ in range(20)))
+
+def test_metrics_of_all_workers_are_rendered(supervisor) -> None:
+    """
+    Test checks if metrics rendered by any worker contain values of all workers labelled with their process IDs.
+    """
+    _, address = supervisor
+    _wait_for(lambda: len(_worker_pids(address)) == 2)
+
+    def answered_requests() -> dict:
+        connection = HTTPConnection(*address, timeout=1)
+        connection.request('GET', '/metrics')
+        lines = connection.getresponse().read().decode().splitlines()
+        connection.close()
+        return {int(line.split('"')[1]): float(line.split()[-1])
+                for line in lines if line.startswith('test_requests_total{')}
+
+    answered = _wait_for(lambda: len(values := answered_requests()) == 2 and values)
+    assert sum(answered.values()) >= 50
+
+def test_sigterm_stops_supervisor_and_workers(supervisor) -> None:
+    """
+    Test checks if SIGTERM stops supervisor gracefully.
+    """
+    process, address = supervisor
+
+    process.send_signal(signal.SIGTERM)
+
+    assert process.wait(timeout=_TIMEOUT) == 0
+    assert _get(address) is None
@@ -0,0 +1,283 @@
+"""
+This module contains integration tests for responses of REST API HTTP server served from local data.
+"""
+import copy
+import gzip
+from http.client import HTTPConnection
+import json
+import threading
+import pytest
+import src.data_consumer as consumer
+import src.server as server
+from src.admission import AdmissionController
+from src.serving import PooledHTTPServer
+from src.warm_up import Prefetcher
+
+_SERVER_LOCAL_IP_ADDR = '127.0.0.7'
+_RAW_WORLD_DATA = [
+    {"name": {"common": "Poland"}, "cca3": "POL", "capital": ["Warsaw"], "region": "Europe", "subregion": "Central Europe", "borders": ["BLR", "CZE", "DEU", "LTU", "RUS", "SVK", "UKR"], "area": 312679.0, "population": 37950802},
+    {"name": {"common": "Czechia"}, "cca3": "CZE", "capital": ["Prague"], "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "DEU", "POL", "SVK"], "area": 78865.0, "population": 10698896},
+    {"name": {"common": "Slovenia"}, "cca3": "SVN", "capital": ["Ljubljana"], "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "HRV", "ITA", "HUN"], "area": 20273.0, "population": 2100126},
+    {"name": {"common": "France"}, "cca3": "FRA", "capital": ["Paris"], "region": "Europe", "subregion": "Western Europe", "borders": ["AND", "BEL", "DEU", "ITA", "LUX", "MCO", "ESP", "CHE"], "area": 551695.0, "population": 67391582},
+    {"name": {"common": "Fiji"}, "cca3": "FJI", "capital": ["Suva"], "region": "Oceania", "subregion": "Melanesia", "borders": [], "area": 18272.0, "population": 896444}]
+
+
+@pytest.fixture(name='api_server')
+def fixture_api_server(monkeypatch):
+    """
+    Fixture that starts server answering from local snapshot of countries data.
+    """
+    monkeypatch.setattr(consumer, '_send_request', lambda host: copy.deepcopy(_RAW_WORLD_DATA))
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'snapshot')
+    consumer._countries_cache.clear()
+    server._response_cache.clear()
+
+    httpd = PooledHTTPServer((_SERVER_LOCAL_IP_ADDR, 0), server.CountriesAPIHandler, workers=2, queue_size=4)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield httpd.server_address
+
+    httpd.shutdown()
+    httpd.server_close()
+    consumer._countries_cache.clear()
+    server._response_cache.clear()
+
+def _get(address: tuple, path: str, headers: dict | None = None):
+    """
+    Function that sends GET request to the server and returns response with read body.
+    """
+    connection = HTTPConnection(*address)
+    connection.request('GET', path, headers={'Accept': 'json'} | (headers or {}))
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+def test_population_of_subregion_body(api_server) -> None:
+    """
+    Test checks if /population_of_subregion endpoint responds with total population attached to every country.
+    """
+    response, body = _get(api_server, '/population_of_subregion/Central%20Europe')
+    assert response.status == 200
+
+    content = json.loads(body)
+    assert [country['name'] for country in content] == ['Poland', 'Czechia', 'Slovenia']
+    assert all(country['Total subregion population'] == 50749824 for country in content)
+
+def test_response_contains_validators(api_server) -> None:
+    """
+    Test checks if response contains ETag and Cache-Control headers.
+    """
+    response, _ = _get(api_server, '/top_ten_countries/Europe')
+
+    assert response.getheader('ETag').startswith('"')
+    assert 0 < int(response.getheader('Cache-Control').removeprefix('max-age=')) <= consumer._CACHE_TTL
+
+def test_if_none_match_returns_not_modified(api_server) -> None:
+    """
+    Test checks if request with matching If-None-Match header is answered with 304 status code without body.
+    """
+    response, _ = _get(api_server, '/all_countries_in_subregion/Central%20Europe')
+    etag = response.getheader('ETag')
+
+    response, body = _get(api_server, '/all_countries_in_subregion/Central%20Europe', {'If-None-Match': etag})
+    assert response.status == 304
+    assert response.getheader('ETag') == etag
+    assert body == b''
+
+    response, _ = _get(api_server, '/all_countries_in_subregion/Central%20Europe', {'If-None-Match': '"other"'})
+    assert response.status == 200
+
+def test_etag_differs_between_formats(api_server) -> None:
+    """
+    Test checks if JSON and CSV representations have different entity tags.
+    """
+    json_response, _ = _get(api_server, '/top_ten_countries/Europe')
+    csv_response, body = _get(api_server, '/top_ten_countries/Europe', {'Accept': 'csv'})
+
+    assert json_response.getheader('ETag') != csv_response.getheader('ETag')
+    assert body.decode().startswith('name,capital,region,subregion,borders,area,population\r\nFrance,')
+
+def test_response_is_compressed_when_accepted(api_server) -> None:
+    """
+    Test checks if response is compressed with gzip when client accepts it.
+    """
+    plain_response, plain_body = _get(api_server, '/population_of_subregion/Central%20Europe')
+    response, body = _get(api_server, '/population_of_subregion/Central%20Europe', {'Accept-Encoding': 'gzip'})
+
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert response.getheader('Content-Type') == 'application/json'
+    assert response.getheader('Vary') == 'Accept, Accept-Encoding'
+    assert int(response.getheader('Content-Length')) == len(body)
+    assert gzip.decompress(body) == plain_body
+    assert plain_response.getheader('Content-Encoding') is None
+    assert response.getheader('ETag') != plain_response.getheader('ETag')
+
+def test_ndjson_format(api_server) -> None:
+    """
+    Test checks if server responds with one JSON object per line when NDJSON is requested.
+    """
+    response, body = _get(api_server, '/all_countries_in_subregion/Central%20Europe', {'Accept': 'application/x-ndjson'})
+
+    assert response.getheader('Content-Type') == 'application/x-ndjson'
+    assert [json.loads(line)['name'] for line in body.decode().splitlines()] == ['Poland', 'Czechia', 'Slovenia']
+    assert body.endswith(b'}\n')
+
+def test_big_response_is_streamed(api_server, monkeypatch) -> None:
+    """
+    Test checks if response exceeding the limit of cached rows is sent with chunked transfer encoding
+    and its body is identical to the cached one.
+    """
+    for accept in ('json', 'csv'):
+        _, cached_body = _get(api_server, '/population_of_subregion/Central%20Europe', {'Accept': accept})
+        server._response_cache.clear()
+        monkeypatch.setattr(server, '_MAX_CACHED_ROWS', 1)
+
+        response, body = _get(api_server, '/population_of_subregion/Central%20Europe', {'Accept': accept})
+        monkeypatch.setattr(server, '_MAX_CACHED_ROWS', 100)
+
+        assert response.getheader('Transfer-Encoding') == 'chunked'
+        assert response.getheader('ETag') is None
+        assert body == cached_body
+
+def test_metrics_endpoint(api_server) -> None:
+    """
+    Test checks if /metrics endpoint exposes request counters, latency histograms and cache statistics.
+    """
+    _get(api_server, '/top_ten_countries/Europe')
+    _get(api_server, '/top_ten_countries/Europe', headers={'Accept': 'text/csv'})
+    response, body = _get(api_server, '/metrics',
+                          headers={'Accept': 'application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5'})
+    metrics = body.decode()
+
+    assert response.status == 200
+    assert response.getheader('Content-Type').startswith('text/plain; version=0.0.4')
+    assert 'countries_api_requests_total{route="/top_ten_countries",format="json",status="200"}' in metrics
+    assert 'countries_api_request_duration_seconds_bucket{route="/top_ten_countries",format="csv",le="+Inf"}' in metrics
+    assert 'countries_api_serialization_duration_seconds_count{format="csv"}' in metrics
+    assert 'countries_api_cache_hits_total{cache="response"}' in metrics
+    assert '# TYPE countries_api_cache_misses_total counter' in metrics
+
+def test_ready_endpoint(api_server, monkeypatch) -> None:
+    """
+    Test checks if /ready endpoint responds with 503 status code until blocking warm-up has finished.
+    """
+    release = threading.Event()
+    prefetcher = Prefetcher(list_keys=consumer.list_areas,
+                            load=lambda kind, name: release.wait(5) and consumer.prefetch(kind, name),
+                            mode='blocking', interval=0)
+    monkeypatch.setattr(server, '_prefetcher', prefetcher)
+    prefetcher.start()
+
+    response, body = _get(api_server, '/ready', headers={'Accept': 'text/csv'})
+    assert response.status == 503
+    assert json.loads(body)['ready'] is False
+
+    release.set()
+    prefetcher.stop()
+    response, body = _get(api_server, '/ready')
+    assert response.status == 200
+    assert json.loads(body) | {'last_run_at': None, 'last_run_duration': None} == {
+        'ready': True, 'mode': 'blocking', 'runs': 1, 'loaded': 1, 'failed': 0,
+        'last_run_at': None, 'last_run_duration': None}
+
+def test_neighbours_endpoints(api_server) -> None:
+    """
+    Test checks if /neighbours and /neighbourhood endpoints respond with countries found in the graph
+    of borders together with their total population.
+    """
+    response, body = _get(api_server, '/neighbours/pol')
+    assert response.status == 200
+    assert json.loads(body) == [
+        {'name': 'Czechia', 'capital': 'Prague', 'region': 'Europe', 'subregion': 'Central Europe',
+         'borders': ['AUT', 'DEU', 'POL', 'SVK'], 'area': 78865.0, 'population': 10698896,
+         'Total neighbours population': 10698896}]
+
+    response, body = _get(api_server, '/neighbourhood/CZE?hops=2', headers={'Accept': 'text/csv'})
+    assert response.status == 200
+    assert body.decode().splitlines()[:2] == [
+        'name,capital,region,subregion,borders,area,population,Hops,Total neighbourhood population',
+        'Poland,Warsaw,Europe,Central Europe,"[\'BLR\', \'CZE\', \'DEU\', \'LTU\', \'RUS\', \'SVK\', \'UKR\']",'
+        '312679.0,37950802,1,37950802']
+
+    for path in ('/neighbours/xyz', '/neighbourhood/pol?hops=0', '/neighbourhood/pol?hops=x',
+                 '/neighbourhood/pol?depth=2'):
+        assert _get(api_server, path)[0].status == 400
+
+def test_admission_control(api_server, monkeypatch) -> None:
+    """
+    Test checks if requests are rejected with Retry-After header when the server is overloaded
+    or the client exceeds its rate, while /metrics and /ready endpoints are always answered
+    and cached data is served while all slots for requests to remote host are taken.
+    """
+    admission = AdmissionController(max_in_flight=1, queue_size=0)
+    monkeypatch.setattr(server, '_admission', admission)
+    with admission.admit(client='other', cached=False):
+        response, body = _get(api_server, '/top_ten_countries/europe')
+        assert (response.status, response.getheader('Retry-After')) == (503, '1')
+        assert body == b'Server is overloaded, try again later\n'
+        assert _get(api_server, '/ready')[0].status == 200
+        assert 'countries_api_admission_in_flight 1' in _get(api_server, '/metrics')[1].decode()
+    assert _get(api_server, '/top_ten_countries/europe')[0].status == 200
+
+    admission = AdmissionController(max_in_flight=2, max_upstream_in_flight=1, queue_size=0)
+    monkeypatch.setattr(server, '_admission', admission)
+    with admission.admit(client='other', cached=False):
+        assert _get(api_server, '/top_ten_countries/europe')[0].status == 200
+
+    monkeypatch.setattr(server, '_admission', AdmissionController(max_in_flight=0, client_rate=0.01, client_burst=1))
+    assert _get(api_server, '/top_ten_countries/europe')[0].status == 200
+    response, _ = _get(api_server, '/top_ten_countries/europe')
+    assert response.status == 429
+    assert int(response.getheader('Retry-After')) > 1
+    assert 'countries_api_rejected_requests_total{reason="rate_limited"}' in _get(api_server, '/metrics')[1].decode()
+
+def test_countries_query(api_server, monkeypatch) -> None:
+    """
+    Test checks if /countries endpoint filters, sorts, limits and projects countries and if in region mode
+    it rejects region or subregion names which would change path of request to remote host, so they neither
+    reach remote host nor take place in the cache.
+    """
+    response, body = _get(api_server, '/countries?region=europe&sort=area&order=desc&limit=2&fields=name,area')
+    assert response.status == 200
+    assert json.loads(body) == [{'name': 'France', 'area': 551695.0}, {'name': 'Poland', 'area': 312679.0}]
+
+    response, body = _get(api_server, '/countries?subregion=Central+Europe&min_borders=5', headers={'Accept': 'csv'})
+    assert response.status == 200
+    assert body.decode().splitlines()[1].startswith('Poland,Warsaw')
+
+    assert _get(api_server, '/countries?sort=area')[0].status == 400
+    assert _get(api_server, '/countries?region=europe&sort=flag')[0].status == 400
+    assert _get(api_server, '/countries?region=europe&fields=')[0].status == 400
+    assert _get(api_server, '/countries?region=europe&min_population=nan')[0].status == 400
+
+    hosts = []
+    def send_request(host: str) -> list:
+        hosts.append(host)
+        return [country for country in copy.deepcopy(_RAW_WORLD_DATA) if country['region'] == 'Europe']
+    monkeypatch.setattr(consumer, '_send_request', send_request)
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'region')
+
+    cache_size = consumer._countries_cache.stats()['size']
+    for path in ('/countries?region=..%2Fall', '/countries?region=europe%23a', '/countries?region=europe%23b',
+                 '/countries?subregion=europe%3Fa'):
+        response, body = _get(api_server, path)
+        assert (response.status, body) == (400, f'{server._AREA_PARAMETER_MSG}\n'.encode())
+    assert hosts == []
+    assert consumer._countries_cache.stats()['size'] == cache_size
+
+    assert _get(api_server, '/countries?region=europe&limit=1')[0].status == 200
+    assert _get(api_server, '/countries?subregion=western+europe&limit=1')[0].status == 200
+    assert hosts == [f'{consumer._COUNTRIES_API_HOST}/region/europe',
+                     f'{consumer._COUNTRIES_API_HOST}/subregion/western%20europe']
+
+def test_aliases_match_countries_query(api_server) -> None:
+    """
+    Test checks if existing endpoints return the same bodies as equivalent queries of /countries endpoint.
+    """
+    for alias, query in [('/top_ten_countries/europe', '/countries?region=europe&sort=population&order=desc&limit=10'),
+                         ('/all_countries_in_subregion/central%20europe', '/countries?subregion=central%20europe&min_borders=4'),
+                         ('/population_of_subregion/central%20europe', '/countries?subregion=central%20europe&with_total_population=1')]:
+        for accept in ('json', 'csv'):
+            assert _get(api_server, alias, headers={'Accept': accept})[1] == _get(api_server, query, headers={'Accept': accept})[1]
@@ -0,0 +1,148 @@
+"""
+This module contains integration tests for concurrent HTTP server.
+"""
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler
+import socket
+import threading
+import time
+import pytest
+from src.serving import PooledHTTPServer
+
+_SERVER_LOCAL_IP_ADDR = '127.0.0.6'
+_SLOW_RESPONSE_TIME = 1
+
+
+class _SlowAndFastHandler(BaseHTTPRequestHandler):
+    """
+    Handler that responds slowly on /slow endpoint and immediately on any other.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        """
+        Function that handles HTTP GET requests received by the server.
+        """
+        if self.path == '/slow':
+            time.sleep(_SLOW_RESPONSE_TIME)
+        body = b'ok\n'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """
+        Function that silences request logging.
+        """
+
+
+@pytest.fixture(name='pooled_server')
+def fixture_pooled_server():
+    """
+    Fixture that starts pooled server in background thread and stops it after test.
+    """
+    server = PooledHTTPServer((_SERVER_LOCAL_IP_ADDR, 0), _SlowAndFastHandler, workers=4, queue_size=8)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server.server_address
+
+    server.shutdown()
+    server.server_close()
+
+def test_fast_request_does_not_wait_for_slow_one(pooled_server) -> None:
+    """
+    Test checks if fast request is answered while slow request is being processed.
+    """
+    slow_connection = HTTPConnection(*pooled_server)
+    slow_connection.request('GET', '/slow')
+
+    start = time.monotonic()
+    fast_connection = HTTPConnection(*pooled_server)
+    fast_connection.request('GET', '/fast')
+    assert fast_connection.getresponse().status == 200
+    assert time.monotonic() - start < _SLOW_RESPONSE_TIME
+
+    assert slow_connection.getresponse().status == 200
+
+def test_keep_alive_connection_is_reused(pooled_server) -> None:
+    """
+    Test checks if several requests can be sent over single connection.
+    """
+    connection = HTTPConnection(*pooled_server)
+    for _ in range(3):
+        connection.request('GET', '/fast')
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.read() == b'ok\n'
+    connection.close()
+
+def test_idle_keep_alive_connections_do_not_hold_workers() -> None:
+    """
+    Test checks if idle keep-alive connections do not make new clients wait when there are more
+    of them than worker threads, and if they are still served afterwards.
+    """
+    server = PooledHTTPServer((_SERVER_LOCAL_IP_ADDR, 0), _SlowAndFastHandler, workers=2, queue_size=8)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        idle_connections = [HTTPConnection(*server.server_address) for _ in range(4)]
+        for connection in idle_connections:
+            connection.request('GET', '/fast')
+            assert connection.getresponse().read() == b'ok\n'
+
+        start = time.monotonic()
+        connection = HTTPConnection(*server.server_address)
+        connection.request('GET', '/fast')
+        assert connection.getresponse().status == 200
+        assert time.monotonic() - start < _SLOW_RESPONSE_TIME
+        connection.close()
+
+        for connection in idle_connections:
+            connection.request('GET', '/fast')
+            assert connection.getresponse().read() == b'ok\n'
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_idle_keep_alive_connection_is_closed() -> None:
+    """
+    Test checks if keep-alive connection idle longer than timeout of the handler class is closed.
+    """
+    class _TimeoutHandler(_SlowAndFastHandler):
+        timeout = 0.2
+
+    server = PooledHTTPServer((_SERVER_LOCAL_IP_ADDR, 0), _TimeoutHandler, workers=1, queue_size=8)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = socket.create_connection(server.server_address, timeout=_SLOW_RESPONSE_TIME * 5)
+        connection.sendall(b'GET /fast HTTP/1.1\r\nHost: test\r\n\r\n')
+        received = b''
+        while not received.endswith(b'ok\n'):
+            received += connection.recv(4096)
+        assert connection.recv(4096) == b''
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_pipelined_requests_are_answered() -> None:
+    """
+    Test checks if requests sent together over single connection are all answered.
+    """
+    server = PooledHTTPServer((_SERVER_LOCAL_IP_ADDR, 0), _SlowAndFastHandler, workers=1, queue_size=8)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = socket.create_connection(server.server_address, timeout=_SLOW_RESPONSE_TIME * 5)
+        connection.sendall(b'GET /fast HTTP/1.1\r\nHost: test\r\n\r\n' * 3)
+        received = b''
+        while received.count(b'ok\n') < 3:
+            received += connection.recv(4096)
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,163 @@
+"""
+This file contains unit tests for AdmissionController class in admission module.
+"""
+import threading
+import time
+import pytest
+from src.admission import AdmissionController, RequestRejectedError
+
+_TIMEOUT = 5
+
+
+def _admit_in_thread(controller: AdmissionController, cached: bool, results: list,
+                     release: threading.Event) -> threading.Thread:
+    """
+    Function that starts thread which requests admission, appends result to the list
+    and holds the slot until release is set.
+    """
+    def run():
+        try:
+            with controller.admit(client='127.0.0.1', cached=cached):
+                results.append(('admitted', cached))
+                release.wait(_TIMEOUT)
+        except RequestRejectedError as error:
+            results.append((error.reason, cached))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def _wait_for(condition: callable) -> None:
+    """
+    Function that waits until condition returns true value.
+    """
+    deadline = time.monotonic() + _TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, 'Condition not met in time'
+        time.sleep(0.005)
+
+def test_requests_under_limit_are_admitted():
+    """
+    Test checks if requests are admitted immediately while the limit is not reached and slots are released.
+    """
+    controller = AdmissionController(max_in_flight=2, queue_size=0)
+    with controller.admit(client='a', cached=False), controller.admit(client='b', cached=False):
+        assert controller.stats() == {'in_flight': 2, 'upstream_in_flight': 2, 'waiting': 0}
+    assert controller.stats() == {'in_flight': 0, 'upstream_in_flight': 0, 'waiting': 0}
+
+def test_full_queue_is_rejected_immediately():
+    """
+    Test checks if request is rejected with 503 status code without waiting when the queue is full.
+    """
+    controller = AdmissionController(max_in_flight=1, queue_size=0, timeout=_TIMEOUT)
+    with controller.admit(client='a', cached=False):
+        start = time.monotonic()
+        with pytest.raises(RequestRejectedError) as error:
+            with controller.admit(client='b', cached=False):
+                pass
+        assert time.monotonic() - start < 1
+    assert (error.value.status_code, error.value.retry_after, error.value.reason) == (503, 1, 'queue_full')
+
+def test_waiting_request_is_admitted_or_expires():
+    """
+    Test checks if waiting request is admitted when slot is released and rejected when the timeout passes.
+    """
+    controller = AdmissionController(max_in_flight=1, queue_size=1, timeout=_TIMEOUT)
+    results, release = [], threading.Event()
+    with controller.admit(client='a', cached=False):
+        thread = _admit_in_thread(controller, False, results, release)
+        _wait_for(lambda: controller.stats()['waiting'] == 1)
+        assert not results
+    _wait_for(lambda: results == [('admitted', False)])
+    release.set()
+    thread.join()
+
+    controller.timeout = 0.05
+    with controller.admit(client='a', cached=False):
+        with pytest.raises(RequestRejectedError) as error:
+            with controller.admit(client='b', cached=False):
+                pass
+    assert error.value.reason == 'expired'
+    assert controller.stats() == {'in_flight': 0, 'upstream_in_flight': 0, 'waiting': 0}
+
+def test_cached_requests_have_priority():
+    """
+    Test checks if requests answered from cache are admitted before requests waiting for remote host
+    and if they displace them from full queue.
+    """
+    controller = AdmissionController(max_in_flight=1, queue_size=2, timeout=_TIMEOUT)
+    results, release = [], threading.Event()
+    with controller.admit(client='a', cached=False):
+        threads = [_admit_in_thread(controller, False, results, release)]
+        _wait_for(lambda: controller.stats()['waiting'] == 1)
+        threads.append(_admit_in_thread(controller, False, results, release))
+        _wait_for(lambda: controller.stats()['waiting'] == 2)
+        threads.append(_admit_in_thread(controller, True, results, release))
+        _wait_for(lambda: results == [('displaced', False)])
+    _wait_for(lambda: len(results) == 2)
+    assert results[1] == ('admitted', True)
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results[2] == ('admitted', False)
+
+    with controller.admit(client='a', cached=False):
+        threads = [_admit_in_thread(controller, True, results, release) for _ in range(2)]
+        _wait_for(lambda: controller.stats()['waiting'] == 2)
+        with pytest.raises(RequestRejectedError):
+            with controller.admit(client='b', cached=True):
+                pass
+    for thread in threads:
+        thread.join()
+
+def test_cached_requests_are_admitted_while_upstream_slots_are_full():
+    """
+    Test checks if requests answered from cache are admitted immediately while all slots for requests
+    waiting for remote host are taken, and if waiting request for remote host is admitted only when
+    one of those slots is released.
+    """
+    controller = AdmissionController(max_in_flight=3, max_upstream_in_flight=2, queue_size=2, timeout=_TIMEOUT)
+    results, release = [], threading.Event()
+    with controller.admit(client='a', cached=False), controller.admit(client='b', cached=False):
+        thread = _admit_in_thread(controller, False, results, release)
+        _wait_for(lambda: controller.stats()['waiting'] == 1)
+
+        start = time.monotonic()
+        with controller.admit(client='c', cached=True):
+            assert controller.stats() == {'in_flight': 3, 'upstream_in_flight': 2, 'waiting': 1}
+        assert time.monotonic() - start < 1
+        assert not results
+    _wait_for(lambda: results == [('admitted', False)])
+    release.set()
+    thread.join()
+    assert controller.stats() == {'in_flight': 0, 'upstream_in_flight': 0, 'waiting': 0}
+
+def test_client_rate_limit():
+    """
+    Test checks if requests exceeding rate of the client are rejected with 429 status code,
+    while other clients are not affected.
+    """
+    controller = AdmissionController(max_in_flight=0, client_rate=1, client_burst=2)
+    for _ in range(2):
+        with controller.admit(client='a', cached=True):
+            pass
+    with pytest.raises(RequestRejectedError) as error:
+        with controller.admit(client='a', cached=True):
+            pass
+    assert (error.value.status_code, error.value.retry_after, error.value.reason) == (429, 1, 'rate_limited')
+
+    with controller.admit(client='b', cached=True):
+        pass
+
+def test_forgotten_clients_are_bounded():
+    """
+    Test checks if number of remembered clients does not exceed the limit.
+    """
+    controller = AdmissionController(max_in_flight=0, client_rate=1, client_burst=1, max_clients=2)
+    for client in ('a', 'b', 'c'):
+        with controller.admit(client=client, cached=True):
+            pass
+    assert list(controller._buckets) == ['b', 'c']
+    with controller.admit(client='a', cached=True):
+        pass
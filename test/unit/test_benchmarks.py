@@ -0,0 +1,74 @@
+"""
+This file contains unit tests for fake remote host and load generator used by benchmarks.
+"""
+import threading
+import pytest
+import requests
+from benchmarks.fake_upstream import FakeUpstreamServer
+from benchmarks.load_generator import build_requests, percentile_of, summarize
+
+
+@pytest.fixture(name='upstream')
+def fixture_upstream():
+    """
+    Fixture starting fake remote host on random local port.
+    """
+    server = FakeUpstreamServer(('127.0.0.1', 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_fake_upstream_serves_fixture(upstream):
+    """
+    Test checks if fake remote host filters countries and fields like restcountries.com does.
+    """
+    response = requests.get(f'{upstream.base_url}/subregion/central europe',
+                            params={'fields': ['name', 'population']}, timeout=5)
+
+    assert response.status_code == 200
+    assert {country['name']['common'] for country in response.json()} >= {'Poland', 'Czechia'}
+    assert all(country.keys() == {'name', 'population'} for country in response.json())
+    assert requests.get(f'{upstream.base_url}/region/Atlantis', timeout=5).status_code == 404
+    assert len(requests.get(f'{upstream.base_url}/all', timeout=5).json()) == len(upstream.countries)
+
+def test_fake_upstream_control(upstream):
+    """
+    Test checks if error rate can be changed with /control endpoint.
+    """
+    host, port = upstream.server_address[:2]
+    requests.get(f'http://{host}:{port}/control', params={'error_rate': 1}, timeout=5)
+
+    assert requests.get(f'{upstream.base_url}/region/Europe', timeout=5).status_code == 503
+    assert upstream.requests_count == 1
+
+def test_percentile_of():
+    """
+    Test for nearest-rank percentile.
+    """
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile_of(values, 50) == 50.0
+    assert percentile_of(values, 99) == 99.0
+    assert percentile_of([3.0], 95) == 3.0
+    assert percentile_of([], 50) == 0.0
+
+def test_summarize():
+    """
+    Test checks if responses with error status codes and failed connections are counted as errors.
+    """
+    summary = summarize(latencies=[0.001, 0.002, 0.003, 0.004], statuses={200: 2, 503: 1, 'error': 1}, duration=2.0)
+
+    assert summary['requests'] == 4
+    assert summary['errors'] == 2
+    assert summary['throughput_rps'] == 2.0
+    assert summary['max_ms'] == 4.0
+
+def test_build_requests():
+    """
+    Test checks if every endpoint is requested in every format.
+    """
+    built = build_requests(regions=['Europe'], subregions=['Central Europe'])
+
+    assert len(built) == 6
+    assert ('/all_countries_in_subregion/Central%20Europe', 'csv') in built
@@ -0,0 +1,77 @@
+"""
+This file contains unit tests for TTLCache class in cache module.
+"""
+import threading
+import time
+from src.cache import TTLCache
+
+def _wait_for(condition, timeout: float = 2.0) -> bool:
+    """
+    Function that waits until condition is met or timeout passes.
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_get_loads_value_once():
+    """
+    Test for get function when value is requested twice.
+    """
+    cache = TTLCache(capacity=2, ttl=60)
+    loads = []
+
+    assert cache.get('europe', lambda: loads.append(1) or 'value') == 'value'
+    assert cache.get('europe', lambda: loads.append(1) or 'other') == 'value'
+    assert len(loads) == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hits'] == 1
+
+def test_get_evicts_least_recently_used():
+    """
+    Test for get function when capacity of the cache is exceeded.
+    """
+    cache = TTLCache(capacity=2, ttl=60)
+    cache.get('asia', lambda: 1)
+    cache.get('europe', lambda: 2)
+    cache.get('asia', lambda: 1)
+    cache.get('oceania', lambda: 3)
+
+    assert cache.peek('europe') is None
+    assert cache.peek('asia') == 1
+    assert cache.stats()['evictions'] == 1
+
+def test_get_returns_stale_value_and_refreshes_it():
+    """
+    Test for get function when entry is expired.
+    """
+    cache = TTLCache(capacity=2, ttl=60)
+    cache.put('europe', 'old', loaded_at=time.monotonic() - 120)
+    release = threading.Event()
+
+    def loader():
+        release.wait(timeout=2)
+        return 'new'
+
+    assert cache.get('europe', loader) == 'old'
+    assert cache.get('europe', loader) == 'old'
+    release.set()
+
+    assert _wait_for(lambda: cache.peek('europe') == 'new')
+    assert cache.stats()['stale'] == 2
+
+def test_get_keeps_stale_value_when_refresh_fails():
+    """
+    Test for get function when refreshing expired entry raises an error.
+    """
+    cache = TTLCache(capacity=2, ttl=60)
+    cache.put('europe', 'old', loaded_at=time.monotonic() - 120)
+
+    def loader():
+        raise ConnectionError('remote host is down')
+
+    assert cache.get('europe', loader) == 'old'
+    assert _wait_for(lambda: cache.stats()['refresh_errors'] == 1)
+    assert cache.get('europe', loader) == 'old'
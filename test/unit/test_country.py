@@ -0,0 +1,84 @@
+"""
+This file contains unit tests for Country class and functions in country module.
+"""
+import json
+import pickle
+import pytest
+from src.country import AnnotatedCountry, Country, encode_country
+from src.csv_converter import convert_json_to_csv
+
+_POLAND = {"name": "Poland", "capital": "Warsaw", "region": "Europe", "subregion": "Central Europe", "borders": ["BLR", "CZE", "DEU", "LTU", "RUS", "SVK", "UKR"], "area": 312679.0, "population": 37950802}
+_NIUE = {"name": "Niue", "capital": "Alofi", "region": "Oceania", "subregion": "Polynesia", "borders": ["IRL"], "area": 260.0, "population": 1470}
+
+def test_from_dict_and_as_dict():
+    """
+    Test for from_dict and as_dict functions.
+    """
+    country = Country.from_dict(_POLAND)
+
+    assert country.as_dict() == _POLAND
+    assert country == _POLAND
+    assert country.population == 37950802
+    assert country.borders == ('BLR', 'CZE', 'DEU', 'LTU', 'RUS', 'SVK', 'UKR')
+
+def test_country_is_immutable():
+    """
+    Test checks if fields of country record cannot be changed.
+    """
+    country = Country.from_dict(_POLAND)
+
+    with pytest.raises(AttributeError):
+        country.population = 0
+    with pytest.raises(AttributeError):
+        country.continent = 'Europe'
+    with pytest.raises(TypeError):
+        country['population'] = 0
+
+def test_region_names_are_shared():
+    """
+    Test checks if region and subregion names are interned.
+    """
+    first = Country.from_dict(_POLAND)
+    second = Country.from_dict(json.loads(json.dumps(_POLAND)))
+
+    assert first.region is second.region
+    assert first.subregion is second.subregion
+
+def test_serialization_matches_dictionaries():
+    """
+    Test checks if country records are serialized to CSV and JSON in the same way as dictionaries.
+    """
+    countries = [Country.from_dict(_POLAND), Country.from_dict(_NIUE)]
+
+    assert convert_json_to_csv(countries) == convert_json_to_csv([_POLAND, _NIUE])
+    assert convert_json_to_csv(countries[0]) == convert_json_to_csv(_POLAND)
+    assert json.dumps(countries, default=encode_country) == json.dumps([_POLAND, _NIUE])
+
+def test_code_is_not_serialized():
+    """
+    Test checks if three-letter code is available as attribute, but not as field of the record.
+    """
+    country = Country.from_dict(_POLAND | {'cca3': 'POL'})
+
+    assert country.code == 'POL'
+    assert country.as_dict() == _POLAND
+    assert 'code' not in country and 'cca3' not in country
+    assert Country.from_dict(_NIUE).code == ''
+    assert pickle.loads(pickle.dumps(country)).code == 'POL'
+
+def test_encoded_record_matches_serialized_dictionary():
+    """
+    Test checks if JSON objects and CSV lines encoded when records are created are identical to serialized dictionaries.
+    """
+    niue = _NIUE | {'capital': 'Alofi, "Niue"', 'name': 'Niuē'}
+    for data in (_POLAND, niue):
+        country = Country.from_dict(data)
+        annotated = AnnotatedCountry(country, {'Hops': 2, 'Total neighbourhood population': 123.5})
+        annotated_data = data | {'Hops': 2, 'Total neighbourhood population': 123.5}
+
+        assert country.encoded_json == json.dumps(data).encode()
+        assert country.encoded_csv == convert_json_to_csv(data).split('\r\n', 1)[1].encode()
+        assert annotated == annotated_data
+        assert annotated.encoded_json == json.dumps(annotated_data).encode()
+        assert annotated.encoded_csv == convert_json_to_csv(annotated_data).split('\r\n', 1)[1].encode()
+        assert json.dumps(annotated, default=encode_country) == json.dumps(annotated_data)
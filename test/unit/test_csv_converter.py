@@ -2,6 +2,7 @@
 This file contains unit tests for functions in csv_converter module.
 """
 
+from src.country import AnnotatedCountry, Country
 import src.csv_converter as converter
 
 def test_convert_json_to_csv_when_list_is_given():
@@ -28,3 +29,32 @@ def test_convert_json_to_csv_when_dict_is_given():
     expected_csv = 'name,capital,region,subregion,borders,area,population\r\nRussia,Moscow,Europe,Eastern Europe,"[\'AZE\', \'BLR\', \'CHN\', \'EST\', \'FIN\', \'GEO\', \'KAZ\', \'PRK\', \'LVA\', \'LTU\', \'MNG\', \'NOR\', \'POL\', \'UKR\']",17098242.0,144104080\r\n'
 
     assert converter.convert_json_to_csv(json_data) == expected_csv
+
+def test_iter_csv_lines():
+    """
+    Test for iter_csv_lines function when generator of rows is given.
+    """
+    rows = ({"name": name, "capital": capital} for name, capital in [("Poland", "Warsaw"), ("Czechia", "Prague")])
+
+    assert list(converter.iter_csv_lines(rows)) == ['name,capital\r\nPoland,Warsaw\r\n', 'Czechia,Prague\r\n']
+
+def test_iter_csv_lines_when_empty_list_is_given():
+    """
+    Test for iter_csv_lines function when there are no rows to convert.
+    """
+    assert list(converter.iter_csv_lines([])) == []
+
+def test_iter_encoded_csv_lines_matches_iter_csv_lines():
+    """
+    Test checks if lines of country records assembled from pre-encoded lines are identical to converted lines.
+    """
+    rows = [{"name": "Bonaire, Sint Eustatius and Saba", "capital": "Kralendijk", "region": "Americas", "subregion": "Caribbean", "borders": [], "area": 328.0, "population": 25987},
+            {"name": "Curaçao", "capital": 'Willemstad "Punda"', "region": "Americas", "subregion": "Caribbean", "borders": [], "area": 444.0, "population": 155014}]
+    countries = [Country.from_dict(row) for row in rows]
+    annotated = [AnnotatedCountry(country, {'Total subregion population': 181001}) for country in countries]
+    annotated_rows = [row | {'Total subregion population': 181001} for row in rows]
+
+    for data, expected in ((countries, rows), (annotated, annotated_rows), (countries[0], rows[0]),
+                           ([annotated[0], countries[1]], [annotated_rows[0], rows[1]]), ([], [])):
+        assert b''.join(converter.iter_encoded_csv_lines(data)) == converter.convert_json_to_csv(expected).encode()
+    assert list(converter.iter_encoded_csv_lines(rows)) == [line.encode() for line in converter.iter_csv_lines(rows)]
@@ -1,8 +1,14 @@
 """
 This file contains unit tests for functions in data_consumer module.
 """
+import copy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import pytest
 import requests
 import src.data_consumer as consumer
+import src.snapshot_store as store
 
 def test_send_region_request():
     """
@@ -102,3 +108,353 @@ def test__sanitize_data():
     raw_mock_data = [{"name":{"common":"Poland","official":"Republic of Poland","nativeName":{"pol":{"official":"Rzeczpospolita Polska","common":"Polska"}}},"capital":["Warsaw"],"region":"Europe","subregion":"Central Europe","borders":["BLR","CZE","DEU","LTU","RUS","SVK","UKR"],"area":312679.0,"population":37950802}]
 
     assert consumer._sanitize_data(raw_mock_data) == sanitized_mock_data
+
+def test_concurrent_region_requests_are_coalesced(monkeypatch):
+    """
+    Test checks if concurrent requests for the same region result in a single request to remote host.
+    """
+    sent_requests = []
+    release = threading.Event()
+
+    def mock_send_request(host):
+        sent_requests.append(host)
+        release.wait(timeout=5)
+        return [{"name": {"common": "Poland"}, "capital": ["Warsaw"], "region": "Europe", "subregion": "Central Europe", "borders": [], "area": 312679.0, "population": 37950802}]
+
+    monkeypatch.setattr(consumer, '_send_request', mock_send_request)
+    consumer._countries_cache.clear()
+    coalesced_before = consumer.get_single_flight_stats()['coalesced']
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(consumer.send_region_request('coalesced region')))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(sent_requests) == 1
+    assert len(results) == 10
+    assert all(result[0]['name'] == 'Poland' for result in results)
+    assert consumer.get_single_flight_stats()['coalesced'] - coalesced_before == 9
+    consumer._countries_cache.clear()
+
+def test_coalesced_callers_receive_error(monkeypatch):
+    """
+    Test checks if error raised by shared request is propagated to every waiting caller.
+    """
+    release = threading.Event()
+
+    def mock_send_request(host):
+        release.wait(timeout=5)
+        raise requests.exceptions.HTTPError('404 Client Error')
+
+    monkeypatch.setattr(consumer, '_send_request', mock_send_request)
+    consumer._countries_cache.clear()
+
+    errors = []
+    def send():
+        try:
+            consumer.send_subregion_request('failing subregion')
+        except requests.exceptions.HTTPError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=send) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 5
+
+_RAW_WORLD_DATA = [
+    {"name": {"common": "Poland"}, "capital": ["Warsaw"], "region": "Europe", "subregion": "Central Europe", "borders": ["BLR", "CZE", "DEU", "LTU", "RUS", "SVK", "UKR"], "area": 312679.0, "population": 37950802},
+    {"name": {"common": "Czechia"}, "capital": ["Prague"], "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "DEU", "POL", "SVK"], "area": 78865.0, "population": 10698896},
+    {"name": {"common": "France"}, "capital": ["Paris"], "region": "Europe", "subregion": "Western Europe", "borders": ["AND", "BEL", "DEU", "ITA", "LUX", "MCO", "ESP", "CHE"], "area": 551695.0, "population": 67391582},
+    {"name": {"common": "Fiji"}, "capital": ["Suva"], "region": "Oceania", "subregion": "Melanesia", "borders": [], "area": 18272.0, "population": 896444}]
+
+def test_snapshot_mode_answers_from_single_request(monkeypatch):
+    """
+    Test checks if in snapshot mode region and subregion requests are answered from one request to remote host.
+    """
+    sent_requests = []
+
+    def mock_send_request(host):
+        sent_requests.append(host)
+        return copy.deepcopy(_RAW_WORLD_DATA)
+
+    monkeypatch.setattr(consumer, '_send_request', mock_send_request)
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'snapshot')
+    consumer._countries_cache.clear()
+
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland', 'Czechia', 'France']
+    assert [country['name'] for country in consumer.send_subregion_request('central europe')] == ['Poland', 'Czechia']
+    assert [country['name'] for country in consumer.send_region_request('Oceania')] == ['Fiji']
+    assert sent_requests == [f'{consumer._COUNTRIES_API_HOST}/all']
+    consumer._countries_cache.clear()
+
+def test_snapshot_mode_unknown_region(monkeypatch):
+    """
+    Test checks if in snapshot mode UnknownAreaError is raised for region missing in the snapshot.
+    """
+    monkeypatch.setattr(consumer, '_send_request', lambda host: copy.deepcopy(_RAW_WORLD_DATA))
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'snapshot')
+    consumer._countries_cache.clear()
+
+    with pytest.raises(consumer.UnknownAreaError):
+        consumer.send_region_request('pangea')
+    consumer._countries_cache.clear()
+
+def test_restore_snapshot_serves_persisted_data(monkeypatch, tmp_path):
+    """
+    Test checks if snapshot restored from the snapshot file is served while fresh one is retrieved.
+    """
+    path = str(tmp_path / 'countries.snapshot')
+    store.save_snapshot(path, consumer._sanitize_data(copy.deepcopy(_RAW_WORLD_DATA[:2])))
+    release = threading.Event()
+
+    def mock_send_request(host):
+        release.wait(timeout=5)
+        return copy.deepcopy(_RAW_WORLD_DATA)
+
+    monkeypatch.setattr(consumer, '_send_request', mock_send_request)
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'snapshot')
+    monkeypatch.setattr(consumer, '_SNAPSHOT_PATH', path)
+    consumer._countries_cache.clear()
+
+    assert consumer.restore_snapshot()
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland', 'Czechia']
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while len(consumer.send_region_request('europe')) != 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland', 'Czechia', 'France']
+    assert store.load_snapshot(path)[0][2]['name'] == 'France'
+    consumer._countries_cache.clear()
+
+def test_restored_snapshot_answers_regions_in_region_mode(monkeypatch, tmp_path):
+    """
+    Test checks if in region mode snapshot restored from the snapshot file answers regions and subregions
+    which are not cached yet, also when remote host is unavailable, and if they are replaced with data
+    retrieved from remote host afterwards.
+    """
+    path = str(tmp_path / 'countries.snapshot')
+    store.save_snapshot(path, consumer._sanitize_data(copy.deepcopy(_RAW_WORLD_DATA[:2])))
+    available = threading.Event()
+    requested_hosts = []
+
+    def mock_send_request(host):
+        requested_hosts.append(host)
+        if not available.is_set():
+            raise requests.ConnectionError('Remote host is unavailable')
+        return copy.deepcopy([_RAW_WORLD_DATA[0]] if host.endswith('/region/europe') else _RAW_WORLD_DATA)
+
+    monkeypatch.setattr(consumer, '_send_request', mock_send_request)
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'region')
+    monkeypatch.setattr(consumer, '_SNAPSHOT_PATH', path)
+    consumer._countries_cache.clear()
+
+    assert consumer.restore_snapshot()
+    assert consumer.is_cached('region', 'europe')
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland', 'Czechia']
+    assert [country['name'] for country in consumer.send_subregion_request('central europe')] == ['Poland', 'Czechia']
+
+
+    available.set()
+    consumer.prefetch('region', 'europe')
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland']
+    assert any(host.endswith('/region/europe') for host in requested_hosts)
+    consumer._countries_cache.clear()
+
+def test_restore_snapshot_corrupted_file(monkeypatch, tmp_path):
+    """
+    Test checks if corrupted snapshot file is ignored.
+    """
+    path = tmp_path / 'countries.snapshot'
+    path.write_bytes(b'garbage')
+    monkeypatch.setattr(consumer, '_SNAPSHOT_PATH', str(path))
+    consumer._countries_cache.clear()
+
+    assert not consumer.restore_snapshot()
+    assert consumer._countries_cache.peek(consumer._SNAPSHOT_KEY) is None
+
+def test_prepare_shared_snapshot_pins_snapshot(monkeypatch, tmp_path):
+    """
+    Test checks if prepared snapshot answers every endpoint without refreshing, if the snapshot file
+    is used when remote host is unavailable at start and if pinned snapshot is kept when it is unavailable later.
+    """
+    path = str(tmp_path / 'countries.snapshot')
+    store.save_snapshot(path, consumer._sanitize_data(copy.deepcopy(_RAW_WORLD_DATA[:2])), fetched_at=0.0)
+
+    def failing_send_request(host):
+        raise requests.ConnectionError('Remote host unavailable')
+
+    monkeypatch.setattr(consumer, '_send_request', failing_send_request)
+    monkeypatch.setattr(consumer, '_SNAPSHOT_PATH', path)
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'region')
+    monkeypatch.setattr(consumer._countries_cache, 'ttl', consumer._CACHE_TTL)
+    consumer._countries_cache.clear()
+    stale = consumer.get_cache_stats()['stale']
+
+    consumer.prepare_shared_snapshot()
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland', 'Czechia']
+    assert consumer.get_cache_stats()['stale'] == stale
+
+    monkeypatch.setattr(consumer, '_send_request', lambda host: copy.deepcopy(_RAW_WORLD_DATA))
+    consumer.prepare_shared_snapshot()
+    assert [country['name'] for country in consumer.send_region_request('europe')] == ['Poland', 'Czechia', 'France']
+
+    monkeypatch.setattr(consumer, '_send_request', failing_send_request)
+    with pytest.raises(requests.ConnectionError):
+        consumer.prepare_shared_snapshot()
+    assert len(consumer.send_region_request('europe')) == 3
+    consumer._countries_cache.clear()
+
+def test_list_areas_and_prefetch(monkeypatch):
+    """
+    Test checks if all regions and subregions are listed in region mode, only the snapshot in snapshot
+    mode, and if prefetched data is stored in the cache, so the next request does not reach remote host
+    and the data is reported as cached.
+    """
+    sent_requests = []
+
+    def mock_send_request(host):
+        sent_requests.append(host)
+        return copy.deepcopy([country for country in _RAW_WORLD_DATA
+                              if host.endswith(('/all', country['region'].lower()))])
+
+    monkeypatch.setattr(consumer._upstream_client, 'get_json', lambda url, params: copy.deepcopy(_RAW_WORLD_DATA))
+    monkeypatch.setattr(consumer, '_send_request', mock_send_request)
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'region')
+    consumer._countries_cache.clear()
+
+    assert consumer.list_areas() == [('region', 'europe'), ('region', 'oceania'), ('subregion', 'central europe'),
+                                     ('subregion', 'melanesia'), ('subregion', 'western europe')]
+
+    assert not consumer.is_cached('region', 'europe')
+    consumer.prefetch('region', 'europe')
+    assert consumer.is_cached('region', 'europe') and not consumer.is_cached('region', 'oceania')
+    assert len(sent_requests) == 1
+    assert len(consumer.send_region_request('europe')) == 3
+    assert len(sent_requests) == 1
+
+    monkeypatch.setattr(consumer, '_DATA_SOURCE', 'snapshot')
+    assert consumer.list_areas() == [('all', '')]
+    assert not consumer.is_cached('region', 'oceania')
+    consumer.prefetch('all', '')
+    assert consumer.is_cached('region', 'oceania') and consumer.is_cached('all', '')
+    assert consumer.send_region_request('oceania')[0]['name'] == 'Fiji'
+    assert len(sent_requests) == 2
+    consumer._countries_cache.clear()
+
+class _StubUpstreamHandler(BaseHTTPRequestHandler):
+    """
+    Handler of stub remote host responding with consecutive status codes from server's status_codes list.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """
+        Function that handles HTTP GET requests received by the stub server.
+        """
+        self.server.received += 1
+        status_code = self.server.status_codes.pop(0) if self.server.status_codes else 200
+        body = b'[{"name": "Poland"}]'
+        self.send_response(status_code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Function that silences request logging.
+        """
+
+@pytest.fixture(name='stub_upstream')
+def fixture_stub_upstream():
+    """
+    Fixture that starts stub remote host in background thread.
+    """
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), _StubUpstreamHandler)
+    stub.status_codes = []
+    stub.received = 0
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    yield stub
+
+    stub.shutdown()
+    stub.server_close()
+
+def test_upstream_client_retries_server_errors(stub_upstream):
+    """
+    Test checks if UpstreamClient retries request which failed with 5xx status code.
+    """
+    stub_upstream.status_codes = [503, 502]
+    client = consumer.UpstreamClient(backoff_base=0.01)
+
+    assert client.get_json(f'http://127.0.0.1:{stub_upstream.server_port}/all') == [{'name': 'Poland'}]
+    assert stub_upstream.received == 3
+    assert client.stats()['retries'] == 2
+
+def test_upstream_client_does_not_retry_client_errors(stub_upstream):
+    """
+    Test checks if UpstreamClient does not retry request which failed with 4xx status code.
+    """
+    stub_upstream.status_codes = [404]
+    client = consumer.UpstreamClient(backoff_base=0.01)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(f'http://127.0.0.1:{stub_upstream.server_port}/region/pangea')
+    assert stub_upstream.received == 1
+
+def test_upstream_client_circuit_breaker(stub_upstream):
+    """
+    Test checks if UpstreamClient stops contacting unhealthy remote host and tries again after reset timeout.
+    """
+    stub_upstream.status_codes = [500, 500]
+    client = consumer.UpstreamClient(max_retries=0, failure_threshold=2, reset_timeout=0.2)
+    url = f'http://127.0.0.1:{stub_upstream.server_port}/all'
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get_json(url)
+    with pytest.raises(consumer.UpstreamUnavailableError):
+        client.get_json(url)
+    assert stub_upstream.received == 2
+    assert client.stats()['circuit'] == 'open'
+
+    time.sleep(0.25)
+    assert client.get_json(url) == [{'name': 'Poland'}]
+    assert client.stats()['circuit'] == 'closed'
+
+def test_upstream_client_circuit_breaker_other_errors(stub_upstream, monkeypatch):
+    """
+    Test checks if error other than connection error during trial request in half-open state
+    reopens the circuit, so the circuit breaker does not stay half-open.
+    """
+    stub_upstream.status_codes = [500]
+    client = consumer.UpstreamClient(max_retries=0, failure_threshold=1, reset_timeout=0.2)
+    url = f'http://127.0.0.1:{stub_upstream.server_port}/all'
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(url)
+    time.sleep(0.25)
+
+    def broken_get(**kwargs):
+        raise requests.exceptions.ChunkedEncodingError('Connection broken: IncompleteRead')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(client._session, 'get', broken_get)
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            client.get_json(url)
+    assert client.stats()['circuit'] == 'open'
+    assert client.stats()['failures'] == 2
+
+    time.sleep(0.25)
+    assert client.get_json(url) == [{'name': 'Poland'}]
+    assert client.stats()['circuit'] == 'closed'
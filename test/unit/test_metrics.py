@@ -0,0 +1,55 @@
+"""
+This file contains unit tests for counters and histograms in metrics module.
+"""
+import threading
+from src.metrics import Counter, Histogram, counter, render_metrics
+
+
+def test_counter_sums_values_of_all_threads():
+    """
+    Test checks if values recorded by different threads, also finished ones, are summed.
+    """
+    requests = Counter('requests_total', 'Requests.', ('route',))
+
+    def record() -> None:
+        for _ in range(1000):
+            requests.inc('/a')
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests.inc('/b', amount=2)
+
+    assert requests.collect() == {('/a',): [4000], ('/b',): [2]}
+    assert requests.collect() == {('/a',): [4000], ('/b',): [2]}
+    assert requests.render() == ['requests_total{route="/a"} 4000', 'requests_total{route="/b"} 2']
+    assert requests.render({('/c',): [1]}, worker='42') == ['requests_total{route="/c",worker="42"} 1']
+
+def test_histogram_buckets_are_cumulative():
+    """
+    Test checks if histogram renders cumulative buckets, sum and count.
+    """
+    latency = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert latency.render() == ['latency_seconds_bucket{le="0.1"} 2',
+                                'latency_seconds_bucket{le="1.0"} 3',
+                                'latency_seconds_bucket{le="+Inf"} 4',
+                                'latency_seconds_sum 3.65',
+                                'latency_seconds_count 4']
+    assert latency.render(worker='42')[0] == 'latency_seconds_bucket{worker="42",le="0.1"} 2'
+
+def test_render_metrics_escapes_label_values():
+    """
+    Test checks if registered metrics are rendered with help, type and escaped label values.
+    """
+    paths = counter('test_paths_total', 'Requested paths.', ('path',))
+    paths.inc('/a"b\\c')
+
+    rendered = render_metrics()
+
+    assert '# HELP test_paths_total Requested paths.\n# TYPE test_paths_total counter' in rendered
+    assert 'test_paths_total{path="/a\\"b\\\\c"} 1' in rendered
@@ -0,0 +1,166 @@
+"""
+This file contains unit tests for CountryGroup and BorderGraph classes in precompute module.
+"""
+import random
+import pytest
+from src.country import Country
+from src.precompute import BorderGraph, CountryGroup, UnknownCountryError
+from src.query import CountryQuery
+
+_COUNTRIES = [Country.from_dict(country) for country in [
+              {"name": "Hungary", "capital": "Budapest", "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "HRV", "ROU", "SRB", "SVK", "SVN", "UKR"], "area": 93028.0, "population": 9749763},
+              {"name": "Slovakia", "capital": "Bratislava", "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "CZE", "HUN", "POL", "UKR"], "area": 49037.0, "population": 5458827},
+              {"name": "Poland", "capital": "Warsaw", "region": "Europe", "subregion": "Central Europe", "borders": ["BLR", "CZE", "DEU", "LTU", "RUS", "SVK", "UKR"], "area": 312679.0, "population": 37950802},
+              {"name": "Slovenia", "capital": "Ljubljana", "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "HRV", "ITA", "HUN"], "area": 20273.0, "population": 2100126},
+              {"name": "Austria", "capital": "Vienna", "region": "Europe", "subregion": "Central Europe", "borders": ["CZE", "DEU", "HUN", "ITA", "LIE", "SVK", "SVN", "CHE"], "area": 83871.0, "population": 8917205},
+              {"name": "Czechia", "capital": "Prague", "region": "Europe", "subregion": "Central Europe", "borders": ["AUT", "DEU", "POL", "SVK"], "area": 78865.0, "population": 10698896}]]
+
+def _biggest(field: str, limit: int) -> CountryQuery:
+    """
+    Function that creates query for the biggest countries, like the one of /ten_biggest_countries_by_region endpoint.
+    """
+    return CountryQuery(sort=field, order='desc', limit=limit)
+
+def _more_neighbours_than(number: int) -> CountryQuery:
+    """
+    Function that creates query for countries with more neighbours, like the one of /all_countries_in_subregion endpoint.
+    """
+    return CountryQuery(ranges={'borders': (number + 1, None)})
+
+def test_query_biggest_countries():
+    """
+    Test for query of the biggest countries for both supported metrics.
+    """
+    group = CountryGroup(_COUNTRIES)
+
+    assert [country['name'] for country in group.query(_biggest('population', 3))] == ['Poland', 'Czechia', 'Hungary']
+    assert [country['name'] for country in group.query(_biggest('area', 2))] == ['Poland', 'Hungary']
+    assert len(group.query(_biggest('population', 10))) == 6
+
+def test_query_more_neighbours_than():
+    """
+    Test for query of countries which border with more than given number of countries.
+    """
+    group = CountryGroup(_COUNTRIES)
+
+    assert [country['name'] for country in group.query(_more_neighbours_than(4))] == ['Hungary', 'Slovakia', 'Poland', 'Austria']
+    assert [country['name'] for country in group.query(_more_neighbours_than(7))] == ['Austria']
+    assert group.query(_more_neighbours_than(8)) == []
+    assert group.query(_more_neighbours_than(-1)) == _COUNTRIES
+
+def test_with_total_population():
+    """
+    Test for total population attached to every country.
+    """
+    group = CountryGroup(_COUNTRIES)
+
+    assert group.total_population == 74875619
+    assert all(country['Total subregion population'] == 74875619 for country in group.with_total_population)
+    assert 'Total subregion population' not in _COUNTRIES[0].as_dict()
+
+def test_empty_group():
+    """
+    Test for group without any country.
+    """
+    group = CountryGroup([])
+
+    assert group.query(_biggest('population', 10)) == []
+    assert group.query(_more_neighbours_than(3)) == []
+    assert group.total_population == 0
+
+def test_query_sort_limit_and_ranges():
+    """
+    Test for query sorted by field with ranges and limit.
+    """
+    group = CountryGroup(_COUNTRIES)
+
+    assert [country['name'] for country in group.query(CountryQuery(sort='area', order='desc', limit=3))] == ['Poland', 'Hungary', 'Austria']
+    assert [country['name'] for country in group.query(CountryQuery(sort='name', limit=2))] == ['Austria', 'Czechia']
+    assert [country['name'] for country in group.query(CountryQuery(sort='population', ranges={'population': (5e6, 1e7)}))] == ['Slovakia', 'Austria', 'Hungary']
+    assert [country['name'] for country in group.query(CountryQuery(sort='borders', order='desc', ranges={'area': (None, 90000)}))] == ['Austria', 'Slovakia', 'Slovenia', 'Czechia']
+    assert group.query(CountryQuery(sort='area', ranges={'area': (1e6, None)})) == []
+
+def test_query_without_sort_keeps_original_order():
+    """
+    Test checks if query without sort field returns countries in original order.
+    """
+    group = CountryGroup(_COUNTRIES)
+    query = CountryQuery(ranges={'borders': (5, None), 'population': (None, 1e7)})
+
+    assert [country['name'] for country in group.query(query)] == ['Hungary', 'Slovakia', 'Austria']
+    assert group.query(CountryQuery(limit=2)) == _COUNTRIES[:2]
+
+def test_query_projection_and_total_population():
+    """
+    Test for query returning selected fields with total population attached.
+    """
+    group = CountryGroup(_COUNTRIES)
+    query = CountryQuery(sort='population', order='desc', limit=1, fields=('population', 'name'),
+                         with_total_population=True)
+
+    assert group.query(query) == [{'population': 37950802, 'name': 'Poland', 'Total subregion population': 74875619}]
+
+def test_query_matches_full_scan():
+    """
+    Test checks if queries answered from indexes return the same countries as sorting and filtering all of them.
+    """
+    group = CountryGroup(_COUNTRIES)
+    keys = {'name': lambda country: country.name, 'population': lambda country: country.population,
+            'area': lambda country: country.area, 'borders': lambda country: len(country.borders)}
+    random_generator = random.Random(7)
+    for _ in range(200):
+        ranges = {}
+        for field in random_generator.sample(['population', 'area', 'borders'], random_generator.randint(0, 3)):
+            low, high = sorted(keys[field](country) for country in random_generator.sample(_COUNTRIES, 2))
+            ranges[field] = (random_generator.choice([None, low]), random_generator.choice([None, high]))
+        sort = random_generator.choice([None, 'name', 'population', 'area', 'borders'])
+        order = random_generator.choice(['asc', 'desc'])
+        limit = random_generator.choice([None, 0, 1, 3])
+
+        expected = [country for country in _COUNTRIES
+                    if all((low is None or keys[field](country) >= low) and (high is None or keys[field](country) <= high)
+                           for field, (low, high) in ranges.items())]
+        if sort:
+            expected = sorted(expected, key=keys[sort], reverse=order == 'desc')
+        expected = expected[:limit]
+
+        assert group.query(CountryQuery(sort=sort, order=order, limit=limit, ranges=ranges)) == expected
+
+_CODES = ('HUN', 'SVK', 'POL', 'SVN', 'AUT', 'CZE')
+_WORLD = [Country.from_dict(country.as_dict() | {'cca3': code}) for country, code in zip(_COUNTRIES, _CODES)] + [
+         Country.from_dict({"name": "Germany", "cca3": "DEU", "capital": "Berlin", "region": "Europe", "subregion": "Western Europe", "borders": ["AUT", "BEL", "CZE", "DNK", "FRA", "LUX", "NLD", "POL", "CHE"], "area": 357114.0, "population": 83240525}),
+         Country.from_dict({"name": "Iceland", "cca3": "ISL", "capital": "Reykjavik", "region": "Europe", "subregion": "Northern Europe", "borders": [], "area": 103000.0, "population": 366425})]
+
+def _names(countries: list) -> list:
+    """
+    Function that returns names of countries.
+    """
+    return [country.name for country in countries]
+
+def test_border_graph_neighbours():
+    """
+    Test checks if only neighbours present in the data are returned with their total population.
+    """
+    graph = BorderGraph(_WORLD)
+
+    neighbours, total = graph.neighbours('cze')
+    assert _names(neighbours) == ['Austria', 'Germany', 'Poland', 'Slovakia']
+    assert total == sum(country.population for country in neighbours)
+    assert _names(graph.neighbours('HUN')[0]) == ['Austria', 'Slovakia', 'Slovenia']
+    assert graph.neighbours('ISL') == ([], 0)
+    with pytest.raises(UnknownCountryError):
+        graph.neighbours('XXX')
+
+def test_border_graph_neighbourhood():
+    """
+    Test checks if countries reachable within given number of borders are ordered by distance.
+    """
+    graph = BorderGraph(_WORLD)
+
+    reached, total = graph.neighbourhood('SVN', 2)
+    assert [(country.name, hops) for country, hops in reached] == [
+        ('Austria', 1), ('Hungary', 1), ('Czechia', 2), ('Germany', 2), ('Slovakia', 2)]
+    assert total == sum(country.population for country, _ in reached)
+    assert _names(country for country, _ in graph.neighbourhood('SVN', 1)[0]) == _names(graph.neighbours('SVN')[0])
+    assert len(graph.neighbourhood('SVN', 10)[0]) == 6
+    assert graph.neighbourhood('ISL', 3) == ([], 0)
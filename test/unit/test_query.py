@@ -0,0 +1,49 @@
+"""
+This file contains unit tests for CountryQuery class in query module.
+"""
+import pytest
+from src.query import CountryQuery, QueryError
+
+
+def test_from_params():
+    """
+    Test for query created from parameters of query string.
+    """
+    query = CountryQuery.from_params({'sort': ['area'], 'order': ['DESC'], 'limit': ['5'], 'min_borders': ['2'],
+                                      'max_population': ['1e7'], 'min_area': [''], 'fields': ['name, area,name'],
+                                      'with_total_population': ['true']})
+
+    assert query.sort == 'area'
+    assert query.order == 'desc'
+    assert query.limit == 5
+    assert query.ranges == {'population': (None, 1e7), 'borders': (2.0, None)}
+    assert query.fields == ('name', 'area')
+    assert query.with_total_population
+
+def test_equal_queries_have_equal_keys():
+    """
+    Test checks if key of query does not depend on order of parameters and default values.
+    """
+    first = CountryQuery.from_params({'min_area': ['10'], 'max_borders': ['3'], 'order': ['asc']})
+    second = CountryQuery(ranges={'borders': (None, 3), 'area': (10, None), 'population': (None, None)})
+
+    assert first.key == second.key
+
+@pytest.mark.parametrize('params', [{'sort': ['capital']}, {'order': ['up']}, {'limit': ['-1']}, {'limit': ['ten']},
+                                    {'min_area': ['big']}, {'fields': ['name,flag']}, {'colour': ['red']},
+                                    {'limit': ['1', '2']}, {'with_total_population': ['maybe']},
+                                    {'fields': ['']}, {'fields': [',']}, {'min_population': ['nan']},
+                                    {'max_area': ['inf']}, {'min_borders': ['-Infinity']}])
+def test_invalid_params(params):
+    """
+    Test checks if invalid parameters are rejected with QueryError.
+    """
+    with pytest.raises(QueryError):
+        CountryQuery.from_params(params)
+
+def test_query_is_immutable():
+    """
+    Test checks if fields of query cannot be changed.
+    """
+    with pytest.raises(AttributeError):
+        CountryQuery().limit = 3
@@ -0,0 +1,97 @@
+"""
+This file contains unit tests for classes in response_cache module.
+"""
+import gzip
+import time
+import zlib
+from src.response_cache import EncodedResponse, ResponseCache, negotiate_coding
+
+def test_lookup_returns_response_stored_for_source():
+    """
+    Test for lookup function when source of the response does not change.
+    """
+    cache = ResponseCache(capacity=4)
+    key = ('top_ten_countries', 'europe', False)
+    source = object()
+
+    assert cache.lookup(key, source) is None
+    stored = cache.store(key, source, EncodedResponse(b'[]\n', expires_at=0))
+
+    assert cache.lookup(key, source) is stored
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_lookup_misses_when_source_changes():
+    """
+    Test for lookup function when response is requested for new source of data.
+    """
+    cache = ResponseCache(capacity=4)
+    key = ('top_ten_countries', 'europe', False)
+
+    old = cache.store(key, object(), EncodedResponse(b'old\n', expires_at=0))
+    source = object()
+    assert cache.lookup(key, source) is None
+    new = cache.store(key, source, EncodedResponse(b'new\n', expires_at=0))
+
+    assert cache.lookup(key, source).body == b'new\n'
+    assert old.etag != new.etag
+    assert cache.stats()['invalidations'] == 1
+
+def test_matches():
+    """
+    Test for matches function with different If-None-Match header values.
+    """
+    response = EncodedResponse(b'[]\n', expires_at=0)
+
+    assert response.matches(response.etag)
+    assert response.matches(f'"other", W/{response.etag}')
+    assert response.matches('*')
+    assert not response.matches('"other"')
+    assert not response.matches(None)
+
+def test_max_age():
+    """
+    Test for max_age function for fresh and stale data.
+    """
+    assert 50 < EncodedResponse(b'', expires_at=time.time() + 60).max_age() <= 60
+    assert EncodedResponse(b'', expires_at=time.time() - 60).max_age() == 0
+
+def test_representation_is_compressed_once():
+    """
+    Test for representation function for supported content codings.
+    """
+    body = b'name,capital\r\n' + b'Poland,Warsaw\r\n' * 100
+    response = EncodedResponse(body, expires_at=0, content_type='text/csv; charset=utf-8')
+
+    gzip_body, gzip_etag = response.representation('gzip')
+    deflate_body, deflate_etag = response.representation('deflate')
+
+    assert gzip.decompress(gzip_body) == body
+    assert zlib.decompress(deflate_body) == body
+    assert response.representation('gzip')[0] is gzip_body
+    assert len({response.etag, gzip_etag, deflate_etag}) == 3
+    assert response.matches(gzip_etag, coding='gzip')
+    assert not response.matches(gzip_etag)
+
+def test_small_response_is_not_compressed():
+    """
+    Test for representation function when body is too small to be compressed.
+    """
+    response = EncodedResponse(b'[]\n', expires_at=0)
+
+    assert response.codings() == ('identity',)
+    assert response.representation('gzip') == (b'[]\n', response.etag)
+
+def test_negotiate_coding():
+    """
+    Test for negotiate_coding function with different Accept-Encoding header values.
+    """
+    available = ('identity', 'gzip', 'deflate')
+
+    assert negotiate_coding('gzip, deflate, br', available) == 'gzip'
+    assert negotiate_coding('gzip;q=0.5, deflate', available) == 'deflate'
+    assert negotiate_coding('br', available) == 'identity'
+    assert negotiate_coding('*', available) == 'gzip'
+    assert negotiate_coding('gzip;q=0', available) == 'identity'
+    assert negotiate_coding(None, available) == 'identity'
+    assert negotiate_coding('gzip', ('identity',)) == 'identity'
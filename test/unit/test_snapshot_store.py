@@ -0,0 +1,48 @@
+"""
+This file contains unit tests for functions in snapshot_store module.
+"""
+import pytest
+import src.snapshot_store as store
+
+_COUNTRIES = [{"name": "Poland", "capital": "Warsaw", "region": "Europe", "subregion": "Central Europe", "borders": ["BLR", "CZE", "DEU", "LTU", "RUS", "SVK", "UKR"], "area": 312679.0, "population": 37950802},
+              {"name": "Fiji", "capital": "Suva", "region": "Oceania", "subregion": "Melanesia", "borders": [], "area": 18272.0, "population": 896444}]
+
+def test_save_and_load_snapshot(tmp_path):
+    """
+    Test for save_snapshot and load_snapshot functions.
+    """
+    path = str(tmp_path / 'countries.snapshot')
+    store.save_snapshot(path, _COUNTRIES, fetched_at=1700000000.0)
+
+    assert store.load_snapshot(path) == (_COUNTRIES, 1700000000.0)
+
+def test_load_snapshot_missing_file(tmp_path):
+    """
+    Test for load_snapshot function when snapshot file does not exist.
+    """
+    with pytest.raises(store.SnapshotFileError):
+        store.load_snapshot(str(tmp_path / 'missing.snapshot'))
+
+def test_load_snapshot_corrupted_file(tmp_path):
+    """
+    Test for load_snapshot function when content of snapshot file is damaged.
+    """
+    path = tmp_path / 'countries.snapshot'
+    store.save_snapshot(str(path), _COUNTRIES)
+    content = bytearray(path.read_bytes())
+    content[-1] ^= 0xFF
+    path.write_bytes(bytes(content))
+
+    with pytest.raises(store.SnapshotFileError):
+        store.load_snapshot(str(path))
+
+def test_load_snapshot_truncated_file(tmp_path):
+    """
+    Test for load_snapshot function when snapshot file is truncated.
+    """
+    path = tmp_path / 'countries.snapshot'
+    store.save_snapshot(str(path), _COUNTRIES)
+    path.write_bytes(path.read_bytes()[:20])
+
+    with pytest.raises(store.SnapshotFileError):
+        store.load_snapshot(str(path))
@@ -0,0 +1,121 @@
+"""
+This file contains unit tests for prefetcher in warm_up module.
+"""
+import threading
+import time
+import pytest
+from src.warm_up import Prefetcher
+
+_KEYS = [('region', 'europe'), ('region', 'oceania'), ('subregion', 'central europe'),
+         ('subregion', 'melanesia'), ('subregion', 'western europe')]
+_TIMEOUT = 5
+
+
+def _wait_for(condition: callable) -> None:
+    """
+    Function that waits until condition returns true value.
+    """
+    deadline = time.monotonic() + _TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, 'Condition not met in time'
+        time.sleep(0.01)
+
+def test_run_once_loads_all_keys_with_bounded_concurrency():
+    """
+    Test checks if all keys are loaded and no more than given number of them at the same time.
+    """
+    loaded = []
+    running = [0, 0]  # currently running, maximum
+    lock = threading.Lock()
+
+    def load(kind, name):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+            loaded.append((kind, name))
+
+    prefetcher = Prefetcher(list_keys=lambda: _KEYS, load=load, mode='background', workers=2)
+
+    assert prefetcher.run_once()
+    assert sorted(loaded) == sorted(_KEYS)
+    assert running[1] == 2
+    assert prefetcher.status() | {'last_run_at': None, 'last_run_duration': None} == {
+        'ready': True, 'mode': 'background', 'runs': 1, 'loaded': 5, 'failed': 0,
+        'last_run_at': None, 'last_run_duration': None}
+
+def test_run_once_counts_failures():
+    """
+    Test checks if failed loads and failed listing of keys are reported.
+    """
+    def load(kind, name):
+        if kind == 'subregion':
+            raise ConnectionError('Remote host unavailable')
+
+    prefetcher = Prefetcher(list_keys=lambda: _KEYS, load=load, mode='background')
+    assert not prefetcher.run_once()
+    assert (prefetcher.status()['loaded'], prefetcher.status()['failed']) == (2, 3)
+
+    def list_keys():
+        raise ConnectionError('Remote host unavailable')
+
+    prefetcher.list_keys = list_keys
+    assert not prefetcher.run_once()
+    assert (prefetcher.status()['loaded'], prefetcher.status()['failed']) == (0, 1)
+
+def test_blocking_mode_is_ready_after_warm_up():
+    """
+    Test checks if in blocking mode the server is ready only after the warm-up has finished,
+    while in other modes it is ready immediately.
+    """
+    release = threading.Event()
+    prefetcher = Prefetcher(list_keys=lambda: _KEYS, load=lambda kind, name: release.wait(_TIMEOUT),
+                            mode='blocking', interval=0)
+    assert not prefetcher.ready()
+
+    prefetcher.start()
+    time.sleep(0.05)
+    assert not prefetcher.status()['ready']
+
+    release.set()
+    _wait_for(prefetcher.ready)
+    prefetcher.stop()
+    assert prefetcher.status()['runs'] == 1
+
+    assert Prefetcher(list_keys=lambda: _KEYS, load=lambda kind, name: None, mode='background').ready()
+    assert Prefetcher(list_keys=lambda: _KEYS, load=lambda kind, name: None, mode='off').ready()
+
+def test_keys_are_loaded_periodically():
+    """
+    Test checks if keys are loaded again every interval until the prefetcher is stopped.
+    """
+    loads = []
+    prefetcher = Prefetcher(list_keys=lambda: _KEYS[:1], load=lambda kind, name: loads.append(name),
+                            mode='background', interval=0.02)
+    prefetcher.start()
+    _wait_for(lambda: len(loads) >= 3)
+    prefetcher.stop()
+
+    loads_after_stop = len(loads)
+    time.sleep(0.05)
+    assert len(loads) == loads_after_stop
+
+def test_off_mode_does_not_load():
+    """
+    Test checks if nothing is loaded when warm-up is turned off.
+    """
+    loads = []
+    prefetcher = Prefetcher(list_keys=lambda: _KEYS, load=lambda kind, name: loads.append(name), mode='off')
+    prefetcher.start()
+    prefetcher.stop()
+    assert not loads
+    assert prefetcher.status()['runs'] == 0
+
+def test_unsupported_mode():
+    """
+    Test checks if unsupported mode is rejected.
+    """
+    with pytest.raises(ValueError):
+        Prefetcher(list_keys=lambda: _KEYS, load=lambda kind, name: None, mode='eager')